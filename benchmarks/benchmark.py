@@ -0,0 +1,174 @@
+"""
+Benchmarks for building tournaments, playing them through and querying them, across bracket sizes.
+Every result is written as a line of JSON with the operation, size, seconds per call and peak memory,
+and can be saved as a baseline and compared against later to catch regressions.
+
+    python -m benchmarks.benchmark --save-baseline baseline.json
+    python -m benchmarks.benchmark --baseline baseline.json
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from double_elimination import Tournament
+from double_elimination.bracket import get_topology, clear_topology_cache
+
+# Powers of two, and counts just around them and in between that have byes in the
+# winner's bracket and merged first loser's rounds.
+SIZES = [
+    2, 3, 5, 6, 7, 8, 13, 100, 255, 256, 257, 1000, 1025, 4097,
+    10000, 65535, 65536, 100000, 2 ** 20 - 1, 2 ** 20,
+]
+# Repeat each measurement until it has taken at least this long, and keep the best run.
+MINIMUM_TIME = 0.2
+MAXIMUM_REPEATS = 1000
+# A result is a regression when it is this many times slower than the baseline, or uses this many times more memory.
+DEFAULT_TOLERANCE = 1.25
+
+
+def play(tournament, number_of_matches=None):
+    # Play matches in bracket order, always picking the left participant.
+    played = 0
+    while number_of_matches is None or played < number_of_matches:
+        matches = tournament.get_active_matches()
+        if len(matches) == 0:
+            return
+        for match in matches:
+            tournament.add_win(match, match.get_participants()[0].get_competitor())
+            played += 1
+            if played == number_of_matches:
+                return
+
+
+def measure(setup, run, changes_state, measure_memory):
+    # Returns the best seconds per run, and the peak bytes allocated during one run.
+    # Runs that change their state get a new one from setup every time.
+    best = None
+    total = 0.0
+    repeats = 0
+    state = setup()
+    while repeats < MAXIMUM_REPEATS and (repeats == 0 or total < MINIMUM_TIME):
+        if changes_state and repeats > 0:
+            state = setup()
+        start = time.perf_counter()
+        run(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        total += elapsed
+        repeats += 1
+    peak_memory = None
+    if measure_memory:
+        state = setup()
+        tracemalloc.start()
+        run(state)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak_memory
+
+
+def get_benchmarks(size):
+    # Returns (operation, setup, run, whether run changes the state) for each benchmark of a bracket size.
+    competitors = list(range(size))
+
+    def build_cold(__):
+        clear_topology_cache()
+        Tournament(competitors)
+
+    def half_played():
+        tournament = Tournament(competitors)
+        play(tournament, len(tournament.get_matches()) // 2)
+        return tournament
+
+    def query(method, *args):
+        # Queries are quick, so each run makes enough calls to be timed.
+        def run(tournament):
+            for __ in range(100):
+                method(tournament, *args)
+        return run
+
+    return [
+        ('construct_cold', lambda: None, build_cold, False),
+        ('construct', lambda: get_topology(size), lambda __: Tournament(competitors), False),
+        ('playthrough', lambda: Tournament(competitors), play, True),
+        ('get_active_matches', half_played, query(Tournament.get_active_matches), False),
+        ('get_active_matches_for_competitor', half_played,
+         query(Tournament.get_active_matches_for_competitor, size // 2), False),
+        ('get_winners', half_played, query(Tournament.get_winners), False),
+    ]
+
+
+def run_benchmarks(sizes, measure_memory, output):
+    results = []
+    for size in sizes:
+        for operation, setup, run, changes_state in get_benchmarks(size):
+            seconds, peak_memory = measure(setup, run, changes_state, measure_memory)
+            if operation.startswith('get_'):
+                seconds /= 100
+            result = {'operation': operation, 'size': size, 'seconds': seconds, 'peak_memory': peak_memory}
+            results.append(result)
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+            memory = '' if peak_memory is None else f' {peak_memory / 1024:12.1f}KiB'
+            print(f'{operation:34} {size:8} {seconds * 1e6:14.2f}us{memory}')
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of (result, measurement, baseline value) for the results that are more than tolerance
+    times slower than the baseline, or use more than tolerance times its peak memory,
+    where measurement is 'seconds' or 'peak_memory'.
+    Peak memory is only compared when both the result and the baseline measured it.
+    """
+    baseline_by_key = {(result['operation'], result['size']): result for result in baseline}
+    regressions = []
+    for result in results:
+        baseline_result = baseline_by_key.get((result['operation'], result['size']))
+        if baseline_result is None:
+            continue
+        for measurement in ('seconds', 'peak_memory'):
+            value = result.get(measurement)
+            baseline_value = baseline_result.get(measurement)
+            if value is not None and baseline_value is not None and value > baseline_value * tolerance:
+                regressions.append((result, measurement, baseline_value))
+    return regressions
+
+
+def format_measurement(measurement, value):
+    if measurement == 'seconds':
+        return f'{value * 1e6:.2f}us'
+    return f'{value / 1024:.1f}KiB'
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--max-size', type=int, default=max(SIZES))
+    parser.add_argument('--no-memory', action='store_true', help='skip measuring peak memory, which is slow')
+    parser.add_argument('--output', default='bench_output.txt', help='the file for JSON lines results')
+    parser.add_argument('--save-baseline', help='save the results as a baseline to this file')
+    parser.add_argument('--baseline', help='compare the results against a baseline in this file')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    sizes = [size for size in args.sizes if size <= args.max_size]
+    with open(args.output, 'w') as output:
+        results = run_benchmarks(sizes, not args.no_memory, output)
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for result, measurement, baseline_value in regressions:
+            print(f"regression: {result['operation']} {result['size']} {measurement}: "
+                  f"{format_measurement(measurement, result[measurement])}, "
+                  f"baseline {format_measurement(measurement, baseline_value)}")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
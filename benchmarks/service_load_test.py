@@ -0,0 +1,68 @@
+"""
+Load test for the TournamentService, through the in-process LocalTransport.
+Every bracket is played through at the same time, reporting all of its ready matches at once,
+and the results per second and latency percentiles of add_win are printed.
+
+    python -m benchmarks.service_load_test --brackets 10000 --competitors 8
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from double_elimination.service import TournamentService, LocalTransport
+
+
+async def play_bracket(transport, tournament_id, number_of_competitors, randomizer, latencies):
+    competitors = [f'{tournament_id}-{seed}' for seed in range(number_of_competitors)]
+    tournament = await transport.request('create', tournament_id, competitors)
+
+    async def report(match_id):
+        match = tournament.get_match(match_id)
+        competitor = randomizer.choice(match.get_participants()).get_competitor()
+        start = time.perf_counter()
+        await transport.request('add_win', tournament_id, match_id, competitor)
+        latencies.append(time.perf_counter() - start)
+
+    while True:
+        match_ids = await transport.request('active_matches', tournament_id)
+        if len(match_ids) == 0:
+            return
+        await asyncio.gather(*[report(match_id) for match_id in match_ids])
+
+
+async def run(number_of_brackets, number_of_competitors, seed):
+    service = TournamentService()
+    transport = LocalTransport(service)
+    randomizer = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        play_bracket(transport, tournament_id, number_of_competitors, randomizer, latencies)
+        for tournament_id in range(number_of_brackets)
+    ])
+    elapsed = time.perf_counter() - start
+    await transport.close()
+    return elapsed, latencies
+
+
+def get_percentile(sorted_values, percentile):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--brackets', type=int, default=10000)
+    parser.add_argument('--competitors', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    elapsed, latencies = asyncio.run(run(args.brackets, args.competitors, args.seed))
+    latencies.sort()
+    print(f'brackets: {args.brackets}, competitors: {args.competitors}')
+    print(f'results: {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} results/sec)')
+    for percentile in (50, 99):
+        print(f'p{percentile} add_win latency: {get_percentile(latencies, percentile) * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
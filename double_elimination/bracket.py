@@ -0,0 +1,344 @@
+"""
+The bracket topology describes the shape of a double elimination tournament,
+independent of who is playing in it.
+It only depends on the number of competitors and whether there is a bracket reset,
+so it is computed once per shape and cached.
+"""
+import bisect
+import functools
+
+# Every participant in a tournament has a slot number.
+# Slots 0 to N - 1 are the competitors in seed order, and after those
+# each match adds two slots, one for its winner and one for its loser.
+# A match's sources are the slot numbers of its left and right participants.
+
+# The result of each match, as in Tournament.get_results.
+NOT_PLAYED = 0
+LEFT_WON = 1
+RIGHT_WON = 2
+
+WINNERS_BRACKET = 'winners'
+LOSERS_BRACKET = 'losers'
+FINALS_BRACKET = 'finals'
+
+# How many distinct bracket shapes to keep around.
+TOPOLOGY_CACHE_SIZE = 256
+
+
+def get_winner_slot(number_of_competitors, match_index):
+    """
+    Return the slot of the winner of a match.
+    """
+    return number_of_competitors + 2 * match_index
+
+
+def get_loser_slot(number_of_competitors, match_index):
+    """
+    Return the slot of the loser of a match.
+    """
+    return number_of_competitors + 2 * match_index + 1
+
+
+class BracketTopology:
+    """
+    The shape of a tournament: a source pair for every match in creation order,
+    the rounds as (bracket, first match index, number of matches) in creation order,
+    the match that each slot feeds (or None), and the positions of the finals and
+    bracket reset finals matches.
+    Instances are shared between tournaments, so they must not be modified.
+    """
+    __slots__ = (
+        'number_of_competitors', 'sources', 'rounds', 'next_matches', 'finals_index', 'bracket_reset_index',
+        'layout',
+    )
+
+    def __init__(self, layout):
+        self.number_of_competitors = layout.number_of_competitors
+        self.sources = layout.get_all_sources()
+        self.rounds = layout.rounds
+        self.finals_index = layout.finals_index
+        self.bracket_reset_index = layout.bracket_reset_index
+        self.layout = layout
+        self.next_matches = layout.get_all_next_matches()
+
+    def __repr__(self) -> str:
+        return f'<BracketTopology num_matches={len(self.sources)}>'
+
+    def __len__(self):
+        return len(self.sources)
+
+    def get_match_index(self, bracket, round_number, slot):
+        """
+        Return the index of the match at a bracket, round and slot,
+        all counted from 0, or None if there is no such match.
+        The finals bracket has the finals in round 0 and the bracket reset in round 1.
+        """
+        return self.layout.get_match_index(bracket, round_number, slot)
+
+    def get_match_label(self, match_index):
+        """
+        Return the (bracket, round, slot) of the match at an index.
+        """
+        return self.layout.get_match_label(match_index)
+
+
+class BracketLayout:
+    """
+    The rounds of a tournament, worked out from the number of competitors by index arithmetic.
+    Each round keeps the slots of its participants in position order as a few runs of evenly
+    spaced slots, (first slot, step, count), so the match at a bracket, round and slot and
+    its sources can be found without building the rest of the bracket.
+    Every round pairs position i with position p - 1 - i, where p is the next power of two
+    at or above its number of participants. The first p - n positions have no opponent (a bye)
+    and keep their participant for the next round, and the others hold the winners of the
+    round's matches, in order.
+    """
+    __slots__ = (
+        'number_of_competitors', 'rounds', 'finals_index', 'bracket_reset_index',
+        '__round_participants', '__round_starts', '__round_numbers', '__round_by_label',
+    )
+
+    def __init__(self, number_of_competitors, bracket_reset_finals=True):
+        # Only tournaments with 2 or more competitors are valid.
+        assert number_of_competitors > 1
+        self.number_of_competitors = number_of_competitors
+        self.rounds = []
+        # The runs and number of participants of each round.
+        self.__round_participants = []
+
+        # The winner's bracket starts with every competitor in seed order. There are
+        # byes in its first round unless the number of competitors is a power of two.
+        runs = [(0, 1, number_of_competitors)]
+        number_of_participants = number_of_competitors
+        losers_by_round = []
+        while number_of_participants > 1:
+            runs, number_of_participants, losers = self.__add_round(WINNERS_BRACKET, runs, number_of_participants)
+            losers_by_round.append(losers)
+        last_winner = _get_slot(runs, 0)
+
+        # If we gave anybody bye's in the winner's bracket and there are
+        # more than 1 loser's bracket rounds, then skip the first loser's
+        # bracket round and merge it with the second loser's bracket round.
+        has_byes = number_of_competitors & (number_of_competitors - 1) != 0
+        if has_byes and len(losers_by_round) > 1:
+            losers_by_round = [losers_by_round[1] + losers_by_round[0]] + losers_by_round[2:]
+        # Reverse the participants of the first loser's round.
+        losers_by_round[0] = _reverse_runs(losers_by_round[0])
+
+        # After the first loser's round, each round of losers from the winner's bracket comes in
+        # ahead of the loser's bracket's own participants, and is followed by a round without
+        # incoming losers. That gives enough rounds to thin out the loser's bracket by a factor
+        # of 4 to match the half as many participants coming from the next winner's round.
+        # A round with a single participant doesn't play and passes it on to the next round.
+        # Once every incoming round is in, rounds continue until one participant is left.
+        last_incoming_round = max(1, 2 * len(losers_by_round) - 2)
+        runs = losers_by_round[0]
+        number_of_participants = _count_runs(runs)
+        loser_round = 0
+        while number_of_participants > 1 or loser_round < last_incoming_round:
+            if number_of_participants > 1:
+                runs, number_of_participants, __ = self.__add_round(LOSERS_BRACKET, runs, number_of_participants)
+            loser_round += 1
+            incoming_index = (loser_round + 1) // 2
+            if loser_round % 2 == 1 and incoming_index < len(losers_by_round):
+                incoming_runs = losers_by_round[incoming_index]
+                runs = incoming_runs + runs
+                number_of_participants += _count_runs(incoming_runs)
+        last_loser = _get_slot(runs, 0)
+
+        # Generate finals match.
+        # Important: the incoming winner should always be the first participant to determine bracket reset
+        self.finals_index = self.__get_number_of_matches()
+        self.__add_round(FINALS_BRACKET, [(last_winner, 1, 1), (last_loser, 1, 1)], 2)
+        self.bracket_reset_index = None
+        if bracket_reset_finals:
+            # The bracket reset is a rematch between the winner and the loser of the finals.
+            self.bracket_reset_index = self.__get_number_of_matches()
+            self.__add_round(FINALS_BRACKET, [(get_winner_slot(number_of_competitors, self.finals_index), 1, 2)], 2)
+        self.rounds = tuple(self.rounds)
+
+        self.__round_starts = [first_index for __, first_index, __ in self.rounds]
+        self.__round_numbers = []
+        self.__round_by_label = {}
+        round_counts = {}
+        for round_index, (bracket, first_index, number_of_matches) in enumerate(self.rounds):
+            round_number = round_counts.get(bracket, 0)
+            round_counts[bracket] = round_number + 1
+            self.__round_numbers.append(round_number)
+            self.__round_by_label[(bracket, round_number)] = round_index
+
+    def __repr__(self) -> str:
+        return f'<BracketLayout num_matches={self.__get_number_of_matches()}>'
+
+    def get_match_index(self, bracket, round_number, slot):
+        """
+        Return the index of the match at a bracket, round and slot,
+        all counted from 0, or None if there is no such match.
+        The finals bracket has the finals in round 0 and the bracket reset in round 1.
+        """
+        round_index = self.__round_by_label.get((bracket, round_number))
+        if round_index is None:
+            return None
+        __, first_index, number_of_matches = self.rounds[round_index]
+        if 0 <= slot < number_of_matches:
+            return first_index + slot
+        return None
+
+    def get_match_label(self, match_index):
+        """
+        Return the (bracket, round, slot) of the match at an index.
+        """
+        assert 0 <= match_index < self.__get_number_of_matches()
+        round_index = bisect.bisect_right(self.__round_starts, match_index) - 1
+        bracket, first_index, __ = self.rounds[round_index]
+        return (bracket, self.__round_numbers[round_index], match_index - first_index)
+
+    def get_sources(self, match_index):
+        """
+        Return the slots of the left and right participants of the match at an index.
+        """
+        assert 0 <= match_index < self.__get_number_of_matches()
+        round_index = bisect.bisect_right(self.__round_starts, match_index) - 1
+        __, first_index, __ = self.rounds[round_index]
+        runs, number_of_participants = self.__round_participants[round_index]
+        power_of_two = 1 << (number_of_participants - 1).bit_length()
+        position = power_of_two - number_of_participants + match_index - first_index
+        return (_get_slot(runs, position), _get_slot(runs, power_of_two - 1 - position))
+
+    def get_all_sources(self):
+        """
+        Return a tuple of the source pair of every match, in match index order.
+        """
+        sources = []
+        for runs, number_of_participants in self.__round_participants:
+            power_of_two = 1 << (number_of_participants - 1).bit_length()
+            half_length = power_of_two // 2
+            left_slots = _get_slots(runs, power_of_two - number_of_participants, half_length)
+            right_slots = _get_slots(runs, half_length, number_of_participants)
+            right_slots.reverse()
+            sources.extend(zip(left_slots, right_slots))
+        return tuple(sources)
+
+    def get_all_next_matches(self):
+        """
+        Return a tuple of the index of the match that each slot feeds, or None.
+        """
+        number_of_matches = self.__get_number_of_matches()
+        next_matches = [None] * (self.number_of_competitors + 2 * number_of_matches)
+        # A run of slots feeds a run of consecutive matches, so they can be filled in as slices.
+        for (__, first_index, __), (runs, number_of_participants) in zip(self.rounds, self.__round_participants):
+            power_of_two = 1 << (number_of_participants - 1).bit_length()
+            half_length = power_of_two // 2
+            # Left participants go to the round's matches in order.
+            match_index = first_index
+            for first_slot, step, count in _get_runs(runs, power_of_two - number_of_participants, half_length):
+                next_matches[_get_slice(first_slot, step, count)] = range(match_index, match_index + count)
+                match_index += count
+            # Right participants go to them in reverse order.
+            match_index = first_index + number_of_participants - half_length - 1
+            for first_slot, step, count in _get_runs(runs, half_length, number_of_participants):
+                next_matches[_get_slice(first_slot, step, count)] = range(match_index, match_index - count, -1)
+                match_index -= count
+        return tuple(next_matches)
+
+    def __get_number_of_matches(self):
+        if len(self.rounds) == 0:
+            return 0
+        __, first_index, number_of_matches = self.rounds[-1]
+        return first_index + number_of_matches
+
+    def __add_round(self, bracket, runs, number_of_participants):
+        # Add a round of matches, and return the runs and number of participants going on to
+        # the next round, and the runs of the losers of the round's matches, in position order.
+        power_of_two = 1 << (number_of_participants - 1).bit_length()
+        number_of_byes = power_of_two - number_of_participants
+        number_of_matches = power_of_two // 2 - number_of_byes
+        first_index = self.__get_number_of_matches()
+        self.rounds.append((bracket, first_index, number_of_matches))
+        self.__round_participants.append((runs, number_of_participants))
+        first_winner_slot = get_winner_slot(self.number_of_competitors, first_index)
+        outgoing_runs = _take_runs(runs, number_of_byes) + [(first_winner_slot, 2, number_of_matches)]
+        return outgoing_runs, power_of_two // 2, [(first_winner_slot + 1, 2, number_of_matches)]
+
+
+def _count_runs(runs):
+    return sum(count for __, __, count in runs)
+
+
+def _get_slot(runs, position):
+    for first_slot, step, count in runs:
+        if position < count:
+            return first_slot + step * position
+        position -= count
+    raise IndexError(position)
+
+
+def _get_runs(runs, start, stop):
+    # Return the runs of the positions start to stop - 1.
+    sliced_runs = []
+    for first_slot, step, count in runs:
+        if start < count and stop > 0:
+            first_position = max(start, 0)
+            sliced_runs.append((first_slot + step * first_position, step, min(stop, count) - first_position))
+        start -= count
+        stop -= count
+    return sliced_runs
+
+
+def _get_slots(runs, start, stop):
+    # Return a list of the slots at positions start to stop - 1.
+    slots = []
+    for first_slot, step, count in _get_runs(runs, start, stop):
+        slots.extend(range(first_slot, first_slot + step * count, step))
+    return slots
+
+
+def _get_slice(first_slot, step, count):
+    # A slice of the slots in a run, which can go down to slot 0.
+    last_slot = first_slot + step * (count - 1)
+    if step < 0:
+        return slice(first_slot, last_slot - 1 if last_slot > 0 else None, step)
+    return slice(first_slot, last_slot + 1, step)
+
+
+def _take_runs(runs, length):
+    # Return the runs of the first length positions.
+    taken_runs = []
+    for first_slot, step, count in runs:
+        if length <= 0:
+            break
+        taken_runs.append((first_slot, step, min(count, length)))
+        length -= count
+    return taken_runs
+
+
+def _reverse_runs(runs):
+    return [(first_slot + step * (count - 1), -step, count) for first_slot, step, count in reversed(runs)]
+
+
+def get_topology(number_of_competitors, bracket_reset_finals=True):
+    """
+    Return the (cached) BracketTopology for a number of competitors.
+    """
+    # lru_cache keys on how it was called, so always call it the same way
+    # to share one topology between every caller.
+    return _get_cached_topology(number_of_competitors, bool(bracket_reset_finals))
+
+
+def clear_topology_cache():
+    """
+    Forget every cached BracketTopology.
+    """
+    _get_cached_topology.cache_clear()
+
+
+@functools.lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def _get_cached_topology(number_of_competitors, bracket_reset_finals):
+    return build_topology(number_of_competitors, bracket_reset_finals)
+
+
+def build_topology(number_of_competitors, bracket_reset_finals=True):
+    """
+    Compute the BracketTopology for a number of competitors without using the cache.
+    """
+    return BracketTopology(BracketLayout(number_of_competitors, bracket_reset_finals))
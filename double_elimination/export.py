@@ -0,0 +1,135 @@
+"""
+Streaming exports of a Tournament's bracket as JSON lines, CSV or Graphviz DOT.
+Matches are written one at a time, in match ID order, so memory use doesn't grow with
+the size of the bracket. Each match carries its (bracket, round, slot) label, where its
+participants come from and where its winner and loser go.
+Passing since_version only exports the matches that changed after that version of the
+tournament (see Tournament.get_version), so small deltas can be published instead.
+"""
+import csv
+import json
+
+from double_elimination.bracket import get_topology, WINNERS_BRACKET, LOSERS_BRACKET, FINALS_BRACKET
+
+SEED = 'seed'
+WINNER = 'winner'
+LOSER = 'loser'
+
+DOT_COLORS = {WINNERS_BRACKET: 'blue', LOSERS_BRACKET: 'red', FINALS_BRACKET: 'black'}
+
+CSV_FIELDS = (
+    'id', 'bracket', 'round', 'slot', 'left', 'right', 'winner', 'loser',
+    'left_from', 'right_from', 'winner_to', 'loser_to',
+)
+
+
+def iter_match_records(tournament, since_version=None):
+    """
+    Yield a dict for each match with its ID, bracket, round, slot, left and right competitors,
+    winner and loser (None until decided), where the left and right participants come from
+    as (SEED, seed index), (WINNER, match ID) or (LOSER, match ID), and the match IDs
+    the winner and loser go to next (None if they don't play again).
+    """
+    topology = get_topology(len(tournament.get_competitors()), tournament.has_bracket_reset_finals())
+    for match_id in _get_match_ids(tournament, since_version):
+        match = tournament.get_match(match_id)
+        left_slot, right_slot = topology.sources[match_id]
+        bracket, round_number, slot = tournament.get_match_label(match)
+        left, right = match.get_participants()
+        winner_to, loser_to = tournament.get_next_matches(match)
+        yield {
+            'id': match_id,
+            'bracket': bracket,
+            'round': round_number,
+            'slot': slot,
+            'left': left.get_competitor(),
+            'right': right.get_competitor(),
+            'winner': match.get_winner_participant().get_competitor(),
+            'loser': match.get_loser_participant().get_competitor(),
+            'left_from': _get_source(topology, left_slot),
+            'right_from': _get_source(topology, right_slot),
+            'winner_to': None if winner_to is None else tournament.get_match_id(winner_to),
+            'loser_to': None if loser_to is None else tournament.get_match_id(loser_to),
+        }
+
+
+def iter_json_lines(tournament, since_version=None):
+    """
+    Yield the bracket as lines of JSON: first a header with the tournament's version and
+    the version the export starts from, then one line per match from iter_match_records.
+    Competitors that aren't JSON serializable are written with str.
+    """
+    yield json.dumps({'version': tournament.get_version(), 'since_version': since_version}) + '\n'
+    for record in iter_match_records(tournament, since_version):
+        yield json.dumps(record, default=str) + '\n'
+
+
+def write_json_lines(tournament, file, since_version=None):
+    """
+    Write the bracket as JSON lines to a text file object.
+    """
+    file.writelines(iter_json_lines(tournament, since_version))
+
+
+def write_csv(tournament, file, since_version=None):
+    """
+    Write the bracket as CSV with a header row of CSV_FIELDS to a text file object,
+    opened with newline=''. Sources are written as 'seed:3', 'winner:5' or 'loser:5'.
+    """
+    writer = csv.writer(file)
+    writer.writerow(CSV_FIELDS)
+    for record in iter_match_records(tournament, since_version):
+        record['left_from'] = '{}:{}'.format(*record['left_from'])
+        record['right_from'] = '{}:{}'.format(*record['right_from'])
+        writer.writerow(['' if record[field] is None else record[field] for field in CSV_FIELDS])
+
+
+def iter_dot_lines(tournament, since_version=None):
+    """
+    Yield the bracket as lines of a Graphviz DOT digraph, with a node for each match, colored
+    by bracket, and an edge for each winner (solid) or loser (dashed) that feeds a match.
+    With since_version, edges can come from matches that didn't change and aren't in the export.
+    """
+    yield 'digraph tournament {\n'
+    yield '  rankdir=LR;\n'
+    yield '  node [shape=box];\n'
+    for record in iter_match_records(tournament, since_version):
+        label = f"{record['bracket']} round {record['round'] + 1} match {record['slot'] + 1}"
+        label += f"\\n{_quote(record['left'])} vs {_quote(record['right'])}"
+        if record['winner'] is not None:
+            label += f"\\nwinner: {_quote(record['winner'])}"
+        color = DOT_COLORS[record['bracket']]
+        yield f'  m{record["id"]} [label="{label}", color={color}];\n'
+        for kind, index in (record['left_from'], record['right_from']):
+            if kind != SEED:
+                style = 'dashed' if kind == LOSER else 'solid'
+                yield f'  m{index} -> m{record["id"]} [style={style}];\n'
+    yield '}\n'
+
+
+def write_dot(tournament, file, since_version=None):
+    """
+    Write the bracket as Graphviz DOT to a text file object.
+    """
+    file.writelines(iter_dot_lines(tournament, since_version))
+
+
+def _get_match_ids(tournament, since_version):
+    if since_version is None:
+        return range(len(tournament.get_matches()))
+    changed_matches = {match for __, __, match in tournament.get_changes_since(since_version)}
+    return sorted(tournament.get_match_id(match) for match in changed_matches)
+
+
+def _get_source(topology, slot):
+    # Slots before the matches' slots are the seeded competitors.
+    if slot < topology.number_of_competitors:
+        return (SEED, slot)
+    match_id, is_loser = divmod(slot - topology.number_of_competitors, 2)
+    return (LOSER if is_loser else WINNER, match_id)
+
+
+def _quote(competitor):
+    if competitor is None:
+        return '?'
+    return str(competitor).replace('\\', '\\\\').replace('"', '\\"')
@@ -0,0 +1,151 @@
+"""
+A TournamentFork is a lightweight branch of a Tournament for "what if" questions.
+It shares the bracket topology, competitors and results of the tournament it was
+forked from, and only stores the results that have been changed since.
+"""
+from double_elimination.bracket import NOT_PLAYED, LEFT_WON, RIGHT_WON
+
+
+class TournamentFork:
+    """
+    A branch of a tournament's state. Matches are referred to by their IDs, or by the
+    tournament's Match objects with add_win, and competitors are the same objects as in the tournament.
+    Recording results on a fork never changes the tournament or other forks.
+    """
+    __slots__ = (
+        '__topology', '__competitors', '__base_results', '__changed_results', '__ready_match_ids',
+        '__handle_by_competitor', '__match_ids',
+    )
+
+    def __init__(self, topology, competitors, base_results, ready_match_ids, changed_results=None,
+                 handle_by_competitor=None, match_ids=None):
+        self.__topology = topology
+        # The ID of each of the tournament's Match objects, if it was forked from one.
+        self.__match_ids = match_ids
+        self.__competitors = competitors
+        # The seed index of each competitor, made when it is first needed if not given.
+        self.__handle_by_competitor = handle_by_competitor
+        self.__base_results = base_results
+        self.__changed_results = {} if changed_results is None else changed_results
+        # A dict keeps the ready matches ordered.
+        self.__ready_match_ids = dict.fromkeys(ready_match_ids)
+
+    def __repr__(self) -> str:
+        return f'<TournamentFork changed_results={len(self.__changed_results)}>'
+
+    def fork(self):
+        """
+        Returns a new branch of this fork's current state.
+        """
+        return TournamentFork(
+            self.__topology,
+            self.__competitors,
+            self.__base_results,
+            self.__ready_match_ids,
+            dict(self.__changed_results),
+            self.__handle_by_competitor,
+            self.__match_ids,
+        )
+
+    def get_result(self, match_id):
+        """
+        Returns NOT_PLAYED, LEFT_WON or RIGHT_WON for a match.
+        """
+        return self.__changed_results.get(match_id, self.__base_results[match_id])
+
+    def get_results(self):
+        """
+        Returns the result of every match as bytes, in match ID order.
+        """
+        results = bytearray(self.__base_results)
+        for match_id, result in self.__changed_results.items():
+            results[match_id] = result
+        return bytes(results)
+
+    def get_participants(self, match_id):
+        """
+        Returns the left and right competitors of a match in a list,
+        with None for any that haven't been decided yet.
+        """
+        return [
+            None if handle is None else self.__competitors[handle]
+            for handle in self.__get_participant_handles(match_id)
+        ]
+
+    def get_active_match_ids(self):
+        """
+        Returns a list of the IDs of all matches that are ready to be played.
+        """
+        return list(self.__ready_match_ids)
+
+    def get_winners(self):
+        """
+        Returns None if the tournament is not done, otherwise
+        returns list of the one victor.
+        """
+        if len(self.__ready_match_ids) > 0:
+            return None
+        last_match_id = len(self.__topology) - 1
+        return [self.__competitors[self.__get_slot_handle(self.__topology.number_of_competitors + 2 * last_match_id)]]
+
+    def add_win(self, match, competitor):
+        """
+        Set the victor of a match, given the competitor string/object and
+        the Match from the tournament this was forked from.
+        """
+        if self.__match_ids is None or match not in self.__match_ids:
+            raise Exception("Match is not in this tournament")
+        self.add_win_by_id(self.__match_ids[match], competitor)
+
+    def add_win_by_id(self, match_id, competitor):
+        """
+        Set the victor of a match, given the match ID and the competitor string/object.
+        """
+        if match_id not in self.__ready_match_ids:
+            raise Exception("Match is not ready to be played")
+        if self.__handle_by_competitor is None:
+            self.__handle_by_competitor = {competitor: handle for handle, competitor in enumerate(self.__competitors)}
+        handle = self.__handle_by_competitor.get(competitor)
+        left_handle, right_handle = self.__get_participant_handles(match_id)
+        if handle is not None and handle == left_handle:
+            result = LEFT_WON
+        elif handle is not None and handle == right_handle:
+            result = RIGHT_WON
+        else:
+            raise Exception("Invalid competitor")
+        self.__set_result(match_id, result)
+        # If the incoming winner of the finals match won the finals match, then don't play the reset
+        topology = self.__topology
+        if match_id == topology.finals_index and topology.bracket_reset_index is not None and result == LEFT_WON:
+            self.__set_result(topology.bracket_reset_index, LEFT_WON)
+
+    def __set_result(self, match_id, result):
+        self.__changed_results[match_id] = result
+        self.__ready_match_ids.pop(match_id, None)
+        topology = self.__topology
+        winner_slot = topology.number_of_competitors + 2 * match_id
+        for slot in (winner_slot, winner_slot + 1):
+            next_match_id = topology.next_matches[slot]
+            if next_match_id is None or self.get_result(next_match_id) != NOT_PLAYED:
+                continue
+            if None not in self.__get_participant_handles(next_match_id):
+                self.__ready_match_ids[next_match_id] = None
+
+    def __get_participant_handles(self, match_id):
+        left_slot, right_slot = self.__topology.sources[match_id]
+        return [self.__get_slot_handle(left_slot), self.__get_slot_handle(right_slot)]
+
+    def __get_slot_handle(self, slot):
+        # Follow the results back up the bracket until reaching a seeded competitor.
+        number_of_competitors = self.__topology.number_of_competitors
+        while slot >= number_of_competitors:
+            match_id, is_loser = divmod(slot - number_of_competitors, 2)
+            result = self.get_result(match_id)
+            if result == NOT_PLAYED:
+                return None
+            left_slot, right_slot = self.__topology.sources[match_id]
+            if (result == LEFT_WON) != bool(is_loser):
+                slot = left_slot
+            else:
+                slot = right_slot
+        return slot
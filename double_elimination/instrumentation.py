@@ -0,0 +1,286 @@
+"""
+Optional instrumentation of Tournament's construction, result recording and query methods.
+enable(sink) replaces those methods with versions that report call counts, timings, the number
+of matches each query returns and the number of tournaments alive to the sink, and disable()
+puts the original methods back, so there is no cost at all while it is disabled.
+A sink is any object with increment(name, value), observe(name, value) and set_gauge(name, value)
+methods, such as a MemoryCollector, whose contents can be written in the Prometheus text format,
+or a StatsdSink, which sends StatsD lines to a UDP socket or writes them to a file.
+"""
+import bisect
+import os
+import socket
+import threading
+import time
+import weakref
+
+from double_elimination.tournament import Tournament
+
+# Timings are observed in seconds, and everything else as a count.
+TIME_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, 10.0)
+SIZE_BUCKETS = tuple(1 << power for power in range(0, 21, 2))
+
+# The Tournament methods that are timed, and whether to observe the number of matches they return.
+INSTRUMENTED_METHODS = (
+    ('__init__', False),
+    ('add_win', False),
+    ('add_wins', False),
+    ('add_wins_by_side', False),
+    ('revert_win', False),
+    ('correct_win', False),
+    ('get_active_matches', True),
+    ('get_active_matches_for_competitor', True),
+    ('get_match_for_competitor', False),
+    ('get_winners', False),
+    # The finals and bracket reset handling that follows results is private, so it goes by its mangled name.
+    ('_Tournament__resolve_bracket_reset', False),
+)
+TOURNAMENTS_ALIVE = 'tournaments_alive'
+
+_original_methods = {}
+_sink = None
+_tournaments_alive = 0
+_tournaments_alive_lock = threading.Lock()
+
+
+def enable(sink):
+    """
+    Start reporting Tournament metrics to a sink, replacing any previous sink.
+    Only tournaments created while metrics are enabled are counted as alive.
+    """
+    global _sink
+    disable()
+    _sink = sink
+    for method_name, observes_matches in INSTRUMENTED_METHODS:
+        method = getattr(Tournament, method_name)
+        _original_methods[method_name] = method
+        metric_name = method_name.replace('_Tournament__', '').strip('_')
+        if method_name == '__init__':
+            wrapper = _wrap_init(method, sink)
+        else:
+            wrapper = _wrap(method, sink, metric_name, observes_matches)
+        setattr(Tournament, method_name, wrapper)
+
+
+def disable():
+    """
+    Stop reporting metrics and put the original Tournament methods back.
+    """
+    global _sink
+    _sink = None
+    for method_name, method in _original_methods.items():
+        setattr(Tournament, method_name, method)
+    _original_methods.clear()
+
+
+def is_enabled():
+    """
+    Returns True if Tournament metrics are being reported.
+    """
+    return len(_original_methods) > 0
+
+
+def _wrap(method, sink, metric_name, observes_matches):
+    calls_name = f'tournament_{metric_name}_calls'
+    seconds_name = f'tournament_{metric_name}_seconds'
+    matches_name = f'tournament_{metric_name}_matches'
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            sink.observe(seconds_name, time.perf_counter() - start)
+            sink.increment(calls_name, 1)
+        if observes_matches:
+            sink.observe(matches_name, len(result))
+        return result
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _wrap_init(method, sink):
+    timed_method = _wrap(method, sink, 'init', False)
+
+    def wrapper(tournament, *args, **kwargs):
+        timed_method(tournament, *args, **kwargs)
+        _change_tournaments_alive(1)
+        weakref.finalize(tournament, _change_tournaments_alive, -1)
+
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _change_tournaments_alive(change):
+    # Tournaments can be garbage collected after the sink changes, so this reports to the current one.
+    global _tournaments_alive
+    with _tournaments_alive_lock:
+        _tournaments_alive += change
+        sink = _sink
+        if sink is not None:
+            sink.set_gauge(TOURNAMENTS_ALIVE, _tournaments_alive)
+
+
+class MemoryCollector:
+    """
+    A sink that keeps counters, gauges and histograms in memory.
+    Histograms of names ending in '_seconds' use TIME_BUCKETS, and others use SIZE_BUCKETS.
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__gauges = {}
+        # For each histogram, its bucket counts, sum and count.
+        self.__histograms = {}
+
+    def __repr__(self) -> str:
+        return f'<MemoryCollector num_metrics={len(self.__counters) + len(self.__gauges) + len(self.__histograms)}>'
+
+    def increment(self, name, value=1):
+        """
+        Add to a counter.
+        """
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """
+        Add a value to a histogram.
+        """
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = [[0] * len(_get_buckets(name)), 0, 0]
+                self.__histograms[name] = histogram
+            bucket_index = bisect.bisect_left(_get_buckets(name), value)
+            if bucket_index < len(histogram[0]):
+                histogram[0][bucket_index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def set_gauge(self, name, value):
+        """
+        Set a gauge to a value.
+        """
+        with self.__lock:
+            self.__gauges[name] = value
+
+    def get_counter(self, name):
+        """
+        Returns the value of a counter, or 0 if it hasn't been incremented.
+        """
+        return self.__counters.get(name, 0)
+
+    def get_gauge(self, name):
+        """
+        Returns the value of a gauge, or None if it hasn't been set.
+        """
+        return self.__gauges.get(name)
+
+    def get_histogram(self, name):
+        """
+        Returns (bucket upper bounds, count in each bucket, sum, count) for a histogram,
+        or None if nothing has been observed. Values above the last bound are only in the count.
+        """
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                return None
+            return _get_buckets(name), list(histogram[0]), histogram[1], histogram[2]
+
+    def format_prometheus(self, prefix='double_elimination_'):
+        """
+        Returns all the metrics in the Prometheus text exposition format.
+        """
+        with self.__lock:
+            counters = sorted(self.__counters.items())
+            gauges = sorted(self.__gauges.items())
+            histograms = sorted((name, list(counts), total, count) for name, (counts, total, count) in self.__histograms.items())
+        lines = []
+        for name, value in counters:
+            lines.append(f'# TYPE {prefix}{name}_total counter')
+            lines.append(f'{prefix}{name}_total {value}')
+        for name, value in gauges:
+            lines.append(f'# TYPE {prefix}{name} gauge')
+            lines.append(f'{prefix}{name} {value}')
+        for name, counts, total, count in histograms:
+            lines.append(f'# TYPE {prefix}{name} histogram')
+            cumulative_count = 0
+            for bound, bucket_count in zip(_get_buckets(name), counts):
+                cumulative_count += bucket_count
+                lines.append(f'{prefix}{name}_bucket{{le="{bound}"}} {cumulative_count}')
+            lines.append(f'{prefix}{name}_bucket{{le="+Inf"}} {count}')
+            lines.append(f'{prefix}{name}_sum {total}')
+            lines.append(f'{prefix}{name}_count {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='double_elimination_'):
+        """
+        Write the metrics in the Prometheus text format to a file, replacing it all at once,
+        as for the node exporter's textfile collector.
+        """
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as file:
+            file.write(self.format_prometheus(prefix))
+        os.replace(temporary_path, path)
+
+
+class StatsdSink:
+    """
+    A sink that sends each metric as a StatsD line, to a UDP address,
+    or to a text file object if one is given. Timings are sent in milliseconds.
+    """
+    def __init__(self, address=('127.0.0.1', 8125), file=None, prefix='double_elimination.'):
+        self.__address = address
+        self.__file = file
+        self.__prefix = prefix
+        self.__socket = None
+        if file is None:
+            self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __repr__(self) -> str:
+        return f'<StatsdSink address={self.__address if self.__file is None else self.__file}>'
+
+    def increment(self, name, value=1):
+        """
+        Send a counter.
+        """
+        self.__send(f'{self.__prefix}{name}:{value}|c')
+
+    def observe(self, name, value):
+        """
+        Send a timing, or a histogram value for names that aren't timings.
+        """
+        if name.endswith('_seconds'):
+            self.__send(f'{self.__prefix}{name[:-len("_seconds")]}:{value * 1000:.6f}|ms')
+        else:
+            self.__send(f'{self.__prefix}{name}:{value}|h')
+
+    def set_gauge(self, name, value):
+        """
+        Send a gauge.
+        """
+        self.__send(f'{self.__prefix}{name}:{value}|g')
+
+    def close(self):
+        """
+        Close the socket, if there is one.
+        """
+        if self.__socket is not None:
+            self.__socket.close()
+
+    def __send(self, line):
+        if self.__file is not None:
+            self.__file.write(line + '\n')
+            return
+        try:
+            self.__socket.sendto(line.encode('utf-8'), self.__address)
+        except OSError:
+            # Metrics are best effort, so a missing StatsD server must not break the tournament.
+            pass
+
+
+def _get_buckets(name):
+    return TIME_BUCKETS if name.endswith('_seconds') else SIZE_BUCKETS
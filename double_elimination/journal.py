@@ -0,0 +1,42 @@
+"""
+A result journal is an append-only file of fixed-size result records.
+Together with a snapshot, it lets a Tournament be recovered after a crash
+by replaying only the results recorded since the snapshot was taken.
+"""
+import struct
+
+# Each record is the match ID and the index of the winning participant,
+# or CLEARED when the result of the match was reverted.
+RECORD = struct.Struct('>IB')
+CLEARED = 2
+
+
+class ResultJournal:
+    """
+    Writes result records to a binary file object opened for appending.
+    Attach it to a tournament with Tournament.set_journal.
+    """
+    __slots__ = ('__file',)
+
+    def __init__(self, file):
+        self.__file = file
+
+    def __repr__(self) -> str:
+        return f'<ResultJournal file={self.__file}>'
+
+    def append(self, match_id, winner_index):
+        """
+        Write one result record and flush it to the file.
+        """
+        self.__file.write(RECORD.pack(match_id, winner_index))
+        self.__file.flush()
+
+
+def read_journal(file):
+    """
+    Read all of the (match ID, winner index) records from a binary file object.
+    A partly written record at the end, from a crash during a write, is ignored.
+    """
+    data = file.read()
+    complete_length = len(data) - len(data) % RECORD.size
+    return list(RECORD.iter_unpack(data[:complete_length]))
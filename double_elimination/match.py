@@ -11,11 +11,14 @@ class Match:
     It adds empty participants as placeholders for the winner and loser,
     so they can be accessed as individual object pointers.
     """
-    def __init__(self, left_participant, right_participant):
+    __slots__ = ('__left_participant', '__right_participant', '__winner', '__loser')
+
+    def __init__(self, left_participant, right_participant, winner=None, loser=None):
         self.__left_participant = left_participant
         self.__right_participant = right_participant
-        self.__winner = Participant()
-        self.__loser = Participant()
+        # The winner and loser placeholders can be passed in, when they are made in bulk.
+        self.__winner = Participant() if winner is None else winner
+        self.__loser = Participant() if loser is None else loser
 
     def __repr__(self) -> str:
         left = self.__left_participant
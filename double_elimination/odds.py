@@ -0,0 +1,211 @@
+"""
+Exact win probabilities for a Tournament, worked out by enumerating the bracket
+instead of by simulation.
+In double elimination, who plays in a loser's bracket or finals match depends on results all
+over the bracket, so the two participants of a match aren't independent. The matches are
+played in bracket order over joint distributions of the participant slots that are still
+waiting for their next match, so the odds are exact. Slots that don't share any earlier
+match are independent, so they are kept in separate factors, which are only joined when
+a match takes its participants from both. A factor's number of joint states grows
+exponentially with the number of undecided matches feeding it, so this only works for small
+brackets, of up to about a dozen entrants, or larger ones with most of their results recorded.
+Use simulate for anything bigger.
+"""
+import itertools
+import math
+
+from double_elimination.bracket import get_topology, LEFT_WON, RIGHT_WON
+
+# The most joint states to go through when computing or updating the odds, before giving up.
+MAX_STATES = 1000000
+
+
+class BracketOdds:
+    """
+    The distribution of the winner and loser of every match of a tournament, given a
+    square matrix (in seed order) where win_probabilities[i][j] is the probability
+    that competitor i beats competitor j.
+    Recorded results are taken into account. After recording, reverting or correcting
+    a result, call update with that match to recompute only the matches that depend on it.
+    Raises an Exception if the bracket needs more than max_states joint states to be gone through,
+    which happens for fresh brackets of more than about a dozen entrants.
+    """
+    def __init__(self, tournament, win_probabilities, max_states=MAX_STATES):
+        self.__tournament = tournament
+        self.__win_probabilities = win_probabilities
+        self.__max_states = max_states
+        competitors = tournament.get_competitors()
+        self.__competitors = competitors
+        topology = get_topology(len(competitors), tournament.has_bracket_reset_finals())
+        self.__topology = topology
+        # The distribution of the winner and loser of each match, as dicts of seed index to probability.
+        self.__winners = [None] * len(topology)
+        self.__losers = [None] * len(topology)
+        self.__steps = []
+        self.__step_by_match_index = {}
+        self.__plan_steps()
+        # The factor made by each step, as a dict of the tuple of seed indexes in its slots to probability.
+        self.__factors = [None] * len(self.__steps)
+        self.__compute(range(len(self.__steps)))
+
+    def __repr__(self) -> str:
+        return f'<BracketOdds num_matches={len(self.__topology)}>'
+
+    def update(self, match):
+        """
+        Recompute the distributions of a match whose result changed,
+        and of the matches that depend on it.
+        """
+        first_step = self.__step_by_match_index[self.__tournament.get_match_id(match)]
+        # A step is recomputed if it is the changed one or takes a factor that was recomputed.
+        changed_steps = {first_step}
+        for step_index in range(first_step + 1, len(self.__steps)):
+            if not changed_steps.isdisjoint(self.__steps[step_index][1]):
+                changed_steps.add(step_index)
+        self.__compute(sorted(changed_steps))
+
+    def get_win_probabilities(self):
+        """
+        Returns a dict of each competitor's probability of winning the tournament.
+        """
+        return self.get_winner_distribution(self.__tournament.get_matches()[-1])
+
+    def get_winner_distribution(self, match):
+        """
+        Returns a dict of each competitor's probability of winning a match.
+        Competitors who can't win it are left out.
+        """
+        return self.__to_competitors(self.__winners[self.__tournament.get_match_id(match)])
+
+    def get_loser_distribution(self, match):
+        """
+        Returns a dict of each competitor's probability of losing a match.
+        Competitors who can't lose it are left out.
+        """
+        return self.__to_competitors(self.__losers[self.__tournament.get_match_id(match)])
+
+    def __to_competitors(self, distribution):
+        return {self.__competitors[seed]: probability for seed, probability in distribution.items()}
+
+    def __plan_steps(self):
+        # Each step plays one match, in match ID order, except that the bracket reset is played
+        # with the finals, since whether it's played depends on who won the finals.
+        # A step takes the factors holding its participants, joins them, and makes a new factor
+        # of their other slots and the winner and loser, if they go on to another match.
+        # A step is (match index, the steps that made the factors it takes, where its left and
+        # right participants are in the joined slots or their seed if they are seeded, the
+        # positions of the joined slots that stay waiting, and which of the winner and loser
+        # go on to wait for another match). Which slots share a factor only depends on the
+        # bracket, so this is worked out once.
+        topology = self.__topology
+        number_of_competitors = topology.number_of_competitors
+        factor_by_slot = {}
+        factor_slots = []
+        for match_index, sources in enumerate(topology.sources):
+            if match_index == topology.bracket_reset_index:
+                self.__step_by_match_index[match_index] = len(self.__steps) - 1
+                continue
+            taken_factors = []
+            for slot in sources:
+                if slot >= number_of_competitors and factor_by_slot[slot] not in taken_factors:
+                    taken_factors.append(factor_by_slot[slot])
+            joined_slots = [slot for factor in taken_factors for slot in factor_slots[factor]]
+            participants = []
+            for slot in sources:
+                if slot < number_of_competitors:
+                    participants.append((None, slot))
+                else:
+                    participants.append((joined_slots.index(slot), None))
+            kept_positions = [position for position, slot in enumerate(joined_slots) if slot not in sources]
+            winner_slot = number_of_competitors + 2 * match_index
+            outputs = []
+            if match_index != topology.finals_index:
+                outputs = [topology.next_matches[slot] is not None for slot in (winner_slot, winner_slot + 1)]
+            step_index = len(self.__steps)
+            slots = [joined_slots[position] for position in kept_positions]
+            slots.extend(slot for slot, output in zip((winner_slot, winner_slot + 1), outputs) if output)
+            for slot in slots:
+                factor_by_slot[slot] = step_index
+            factor_slots.append(slots)
+            self.__step_by_match_index[match_index] = step_index
+            self.__steps.append((match_index, taken_factors, participants, kept_positions, outputs))
+
+    def __compute(self, step_indexes):
+        results = self.__tournament.get_results()
+        number_of_states = 0
+        for step_index in step_indexes:
+            step = self.__steps[step_index]
+            # Checked before each step, so a bracket that is too large fails quickly.
+            number_of_states += math.prod(len(self.__factors[factor]) for factor in step[1])
+            if number_of_states > self.__max_states:
+                raise Exception("Bracket is too large for exact odds")
+            self.__factors[step_index] = self.__play(step, results)
+
+    def __join(self, taken_factors):
+        # Returns the joint states of independent factors, as (state, probability) pairs.
+        if len(taken_factors) == 0:
+            return [((), 1.0)]
+        if len(taken_factors) == 1:
+            return self.__factors[taken_factors[0]].items()
+        left_factor, right_factor = (self.__factors[factor] for factor in taken_factors)
+        return [
+            (left_state + right_state, left_probability * right_probability)
+            for (left_state, left_probability), (right_state, right_probability)
+            in itertools.product(left_factor.items(), right_factor.items())
+        ]
+
+    def __get_outcomes(self, left, right, result):
+        # Returns a list of (winner, loser, probability, whether the left participant won).
+        if result == LEFT_WON:
+            return [(left, right, 1.0, True)]
+        if result == RIGHT_WON:
+            return [(right, left, 1.0, False)]
+        win_probability = self.__win_probabilities[left][right]
+        return [(left, right, win_probability, True), (right, left, 1.0 - win_probability, False)]
+
+    def __play(self, step, results):
+        # Returns the factor made by a step, and stores the distributions of its matches.
+        match_index, taken_factors, participants, kept_positions, outputs = step
+        (left_position, left_seed), (right_position, right_seed) = participants
+        topology = self.__topology
+        is_finals_with_reset = match_index == topology.finals_index and topology.bracket_reset_index is not None
+        keeps_winner, keeps_loser = outputs if len(outputs) > 0 else (False, False)
+        winners = {}
+        losers = {}
+        reset_winners = {}
+        reset_losers = {}
+        next_states = {}
+        for state, probability in self.__join(taken_factors):
+            left = left_seed if left_position is None else state[left_position]
+            right = right_seed if right_position is None else state[right_position]
+            kept_state = tuple(map(state.__getitem__, kept_positions))
+            for winner, loser, win_probability, left_won in self.__get_outcomes(left, right, results[match_index]):
+                outcome_probability = probability * win_probability
+                if outcome_probability == 0.0:
+                    continue
+                winners[winner] = winners.get(winner, 0.0) + outcome_probability
+                losers[loser] = losers.get(loser, 0.0) + outcome_probability
+                if is_finals_with_reset:
+                    if left_won:
+                        # The incoming winner won the finals, so the reset is decided with it.
+                        reset_outcomes = [(winner, loser, 1.0, True)]
+                    else:
+                        reset_outcomes = self.__get_outcomes(winner, loser, results[topology.bracket_reset_index])
+                    for reset_winner, reset_loser, reset_probability, __ in reset_outcomes:
+                        reset_probability *= outcome_probability
+                        if reset_probability == 0.0:
+                            continue
+                        reset_winners[reset_winner] = reset_winners.get(reset_winner, 0.0) + reset_probability
+                        reset_losers[reset_loser] = reset_losers.get(reset_loser, 0.0) + reset_probability
+                next_state = kept_state
+                if keeps_winner:
+                    next_state += (winner,)
+                if keeps_loser:
+                    next_state += (loser,)
+                next_states[next_state] = next_states.get(next_state, 0.0) + outcome_probability
+        self.__winners[match_index] = winners
+        self.__losers[match_index] = losers
+        if is_finals_with_reset:
+            self.__winners[topology.bracket_reset_index] = reset_winners
+            self.__losers[topology.bracket_reset_index] = reset_losers
+        return next_states
@@ -8,6 +8,8 @@ class Participant:
     The Participant class represents a participant in a specific match.
     It can be used as a placeholder until the participant is decided.
     """
+    __slots__ = ('competitor',)
+
     def __init__(self, competitor=None):
         self.competitor = competitor
 
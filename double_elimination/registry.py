@@ -0,0 +1,169 @@
+"""
+A registry of many tournaments by ID that keeps their memory use under a budget,
+by evicting finished and least recently used tournaments to binary snapshots on disk
+and loading them back when they are next used.
+"""
+import collections
+import os
+import tempfile
+
+from double_elimination.snapshot import check_competitors, dump_snapshot, load_snapshot
+from double_elimination.tournament import TOURNAMENT_WON, MATCH_CLEARED
+
+# A rough size of a played tournament in memory, including its events, per match.
+ESTIMATED_BYTES_PER_MATCH = 700
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+class TournamentRegistry:
+    """
+    Holds tournaments by ID, keeping at most about memory_budget bytes of them in memory.
+    When it is over budget, finished tournaments are evicted first, oldest finished first,
+    then the least recently used ones. Evicted tournaments are written as snapshots
+    to files in directory, so their competitors have to be JSON serializable.
+    Always get a tournament from the registry before using it, rather than keeping a reference,
+    since a tournament that was evicted and loaded again is a new object. Loading a tournament
+    restores its results and version, but not its subscribers, journal, event history or thread safe mode,
+    so get_changes_since raises an Exception for versions from before it was evicted.
+    Snapshot files get unique names, so registries can share a directory.
+    """
+    def __init__(self, directory, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.__directory = directory
+        self.__memory_budget = memory_budget
+        self.__memory_used = 0
+        # Tournaments in memory, from least to most recently used, with their size and subscriber.
+        self.__tournaments = collections.OrderedDict()
+        # The IDs of finished tournaments in memory, in the order they finished.
+        self.__finished_ids = {}
+        # The snapshot file of each evicted tournament, and the version it was evicted at.
+        self.__paths = {}
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def __repr__(self) -> str:
+        return f'<TournamentRegistry num_tournaments={len(self)} num_loaded={len(self.__tournaments)}>'
+
+    def __len__(self):
+        return len(self.__tournaments) + len(self.__paths)
+
+    def __contains__(self, tournament_id):
+        return tournament_id in self.__tournaments or tournament_id in self.__paths
+
+    def add(self, tournament_id, tournament):
+        """
+        Start holding a tournament under an ID.
+        Raises an Exception if its competitors can't be stored in a snapshot.
+        """
+        if tournament_id in self:
+            raise Exception("Tournament already exists")
+        check_competitors(tournament.get_competitors())
+        self.__load(tournament_id, tournament)
+        self.__evict(tournament_id)
+
+    def get(self, tournament_id):
+        """
+        Returns the tournament with an ID, loading it from disk if it was evicted.
+        """
+        entry = self.__tournaments.get(tournament_id)
+        if entry is not None:
+            self.__hits += 1
+            self.__tournaments.move_to_end(tournament_id)
+            return entry[0]
+        evicted = self.__paths.get(tournament_id)
+        if evicted is None:
+            raise Exception("Tournament does not exist")
+        path, version = evicted
+        self.__misses += 1
+        with open(path, 'rb') as file:
+            tournament = load_snapshot(file.read(), version)
+        os.remove(path)
+        del self.__paths[tournament_id]
+        self.__load(tournament_id, tournament)
+        self.__evict(tournament_id)
+        return tournament
+
+    def remove(self, tournament_id):
+        """
+        Stop holding a tournament, and delete its snapshot if it was evicted.
+        """
+        if tournament_id in self.__tournaments:
+            self.__unload(tournament_id)
+        elif tournament_id in self.__paths:
+            os.remove(self.__paths.pop(tournament_id)[0])
+        else:
+            raise Exception("Tournament does not exist")
+
+    def get_memory_used(self):
+        """
+        Returns the estimated number of bytes used by the tournaments in memory.
+        """
+        return self.__memory_used
+
+    def get_hits(self):
+        """
+        Returns how many times get found a tournament in memory.
+        """
+        return self.__hits
+
+    def get_misses(self):
+        """
+        Returns how many times get had to load a tournament from disk.
+        """
+        return self.__misses
+
+    def get_evictions(self):
+        """
+        Returns how many times a tournament was written to disk to save memory.
+        """
+        return self.__evictions
+
+    def __load(self, tournament_id, tournament):
+        size = ESTIMATED_BYTES_PER_MATCH * len(tournament.get_matches())
+
+        def track(event):
+            __, kind, __ = event
+            if kind == TOURNAMENT_WON:
+                self.__finished_ids[tournament_id] = None
+            elif kind == MATCH_CLEARED:
+                self.__finished_ids.pop(tournament_id, None)
+
+        tournament.subscribe(track)
+        self.__tournaments[tournament_id] = (tournament, size, track)
+        self.__memory_used += size
+        if tournament.get_winners() is not None:
+            self.__finished_ids[tournament_id] = None
+
+    def __unload(self, tournament_id):
+        tournament, size, track = self.__tournaments.pop(tournament_id)
+        tournament.unsubscribe(track)
+        self.__finished_ids.pop(tournament_id, None)
+        self.__memory_used -= size
+        return tournament
+
+    def __evict(self, keep_id):
+        # Evict until under budget, but never the tournament that is being used.
+        while self.__memory_used > self.__memory_budget:
+            evicted_id = next((finished_id for finished_id in self.__finished_ids if finished_id != keep_id), None)
+            if evicted_id is None:
+                evicted_id = next(iter(self.__tournaments))
+                if evicted_id == keep_id:
+                    if len(self.__tournaments) == 1:
+                        return
+                    self.__tournaments.move_to_end(keep_id)
+                    continue
+            # The tournament is only unloaded once its whole snapshot is on disk, so if writing
+            # it fails, it stays in memory and no partial snapshot is left behind.
+            tournament = self.__tournaments[evicted_id][0]
+            snapshot = dump_snapshot(tournament)
+            # The file is created with a name no other registry in the directory is using.
+            descriptor, path = tempfile.mkstemp(suffix='.snapshot', dir=self.__directory)
+            try:
+                with open(descriptor, 'wb') as file:
+                    file.write(snapshot)
+            except OSError:
+                os.remove(path)
+                raise
+            self.__unload(evicted_id)
+            self.__paths[evicted_id] = (path, tournament.get_version())
+            self.__evictions += 1
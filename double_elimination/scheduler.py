@@ -0,0 +1,187 @@
+"""
+Assigns the matches of a Tournament that are ready to be played to a limited number of stations
+(setups, courts, tables), and estimates how long an event will take with a given number of stations.
+Matches on the longest chain of matches still to come are played first, so long winner's bracket
+chains don't hold up the loser's bracket, and competitors get a rest between their matches.
+"""
+import heapq
+import random
+import time
+
+from double_elimination.bracket import get_topology
+from double_elimination.tournament import Tournament, MATCH_READY, MATCH_NOT_READY, MATCH_COMPLETED, MATCH_CLEARED
+
+
+def get_match_priorities(topology):
+    """
+    Returns two lists by match index: the depth of each match, which is the most matches
+    played before it on any path from the seeds, and its critical path length, which is
+    the most matches on any path from it to the end of the tournament, counting itself.
+    """
+    number_of_competitors = topology.number_of_competitors
+    depths = []
+    for left_slot, right_slot in topology.sources:
+        depth = 0
+        for slot in (left_slot, right_slot):
+            if slot >= number_of_competitors:
+                depth = max(depth, depths[(slot - number_of_competitors) // 2] + 1)
+        depths.append(depth)
+    # Matches only feed later matches, so going backwards each one's next matches are done.
+    critical_paths = [1] * len(topology)
+    for match_index in range(len(topology) - 1, -1, -1):
+        winner_slot = number_of_competitors + 2 * match_index
+        for slot in (winner_slot, winner_slot + 1):
+            next_match_index = topology.next_matches[slot]
+            if next_match_index is not None:
+                critical_paths[match_index] = max(critical_paths[match_index], critical_paths[next_match_index] + 1)
+    return depths, critical_paths
+
+
+class StationScheduler:
+    """
+    Keeps the ready matches of a tournament in a priority queue and assigns them to free stations,
+    longest critical path first, then lowest depth, then lowest match ID, but only once both
+    competitors have rested for rest_time since their last match.
+    It follows the tournament's events, so a station is freed when its match's result is recorded
+    with add_win (or the match stops being ready), and the queue is updated incrementally.
+    clock returns the current time, in the same unit as rest_time.
+    """
+    def __init__(self, tournament, number_of_stations, rest_time=0.0, clock=time.monotonic):
+        assert number_of_stations > 0
+        self.__tournament = tournament
+        self.__rest_time = rest_time
+        self.__clock = clock
+        topology = get_topology(len(tournament.get_competitors()), tournament.has_bracket_reset_finals())
+        self.__depths, self.__critical_paths = get_match_priorities(topology)
+        # The match on each station, or None if it is free.
+        self.__stations = [None] * number_of_stations
+        self.__station_by_match_id = {}
+        # When each competitor can play again.
+        self.__rested_times = {}
+        # Ready matches waiting for their competitors to rest, as (start time, match ID),
+        # and ready matches that can start now, as (-critical path, depth, match ID).
+        # Matches that stop being ready are left in the heaps and skipped when they come up.
+        self.__resting = []
+        self.__waiting = []
+        self.__queued_match_ids = set()
+        for match in tournament.get_active_matches():
+            self.__queue(tournament.get_match_id(match))
+        tournament.subscribe(self.__on_event)
+
+    def __repr__(self) -> str:
+        return f'<StationScheduler num_stations={len(self.__stations)} num_queued={len(self.__queued_match_ids)}>'
+
+    def get_assignments(self):
+        """
+        Returns a list with the match on each station, or None for free stations.
+        """
+        return [None if match_id is None else self.__tournament.get_match(match_id) for match_id in self.__stations]
+
+    def get_station(self, match):
+        """
+        Returns the station a match is assigned to, or None.
+        """
+        return self.__station_by_match_id.get(self.__tournament.get_match_id(match))
+
+    def get_next_start_time(self):
+        """
+        Returns the earliest time a queued match can start, or None if no matches are queued.
+        """
+        self.__skip_stale(self.__waiting, 2)
+        if len(self.__waiting) > 0:
+            return self.__clock()
+        self.__skip_stale(self.__resting, 1)
+        if len(self.__resting) > 0:
+            return self.__resting[0][0]
+        return None
+
+    def assign(self):
+        """
+        Assign queued matches whose competitors have rested to the free stations,
+        and return a list of the new (station, match) assignments.
+        """
+        now = self.__clock()
+        resting = self.__resting
+        while len(resting) > 0 and resting[0][0] <= now:
+            __, match_id = heapq.heappop(resting)
+            if match_id in self.__queued_match_ids:
+                heapq.heappush(self.__waiting, (-self.__critical_paths[match_id], self.__depths[match_id], match_id))
+        assignments = []
+        for station, station_match_id in enumerate(self.__stations):
+            if station_match_id is not None:
+                continue
+            self.__skip_stale(self.__waiting, 2)
+            if len(self.__waiting) == 0:
+                break
+            match_id = heapq.heappop(self.__waiting)[2]
+            self.__queued_match_ids.discard(match_id)
+            self.__stations[station] = match_id
+            self.__station_by_match_id[match_id] = station
+            assignments.append((station, self.__tournament.get_match(match_id)))
+        return assignments
+
+    def __skip_stale(self, heap, match_id_index):
+        # Drop matches from the top of a heap that are no longer queued.
+        while len(heap) > 0 and heap[0][match_id_index] not in self.__queued_match_ids:
+            heapq.heappop(heap)
+
+    def __queue(self, match_id):
+        left, right = self.__tournament.get_match(match_id).get_participants()
+        start_time = max(
+            self.__rested_times.get(left.get_competitor(), 0.0),
+            self.__rested_times.get(right.get_competitor(), 0.0),
+        )
+        self.__queued_match_ids.add(match_id)
+        heapq.heappush(self.__resting, (start_time, match_id))
+
+    def __free(self, match_id):
+        self.__queued_match_ids.discard(match_id)
+        station = self.__station_by_match_id.pop(match_id, None)
+        if station is not None:
+            self.__stations[station] = None
+
+    def __on_event(self, event):
+        __, kind, match = event
+        match_id = self.__tournament.get_match_id(match)
+        if kind == MATCH_READY:
+            self.__queue(match_id)
+        elif kind == MATCH_COMPLETED:
+            self.__free(match_id)
+            rested_time = self.__clock() + self.__rest_time
+            for participant in (match.get_winner_participant(), match.get_loser_participant()):
+                self.__rested_times[participant.get_competitor()] = rested_time
+        elif kind == MATCH_NOT_READY or kind == MATCH_CLEARED:
+            self.__free(match_id)
+
+
+def simulate_event_duration(number_of_competitors, number_of_stations, match_duration=1.0, rest_time=0.0,
+                            bracket_reset_finals=True, seed=None):
+    """
+    Estimate how long an event takes with a StationScheduler, by playing out a tournament
+    with random winners as a discrete-event simulation, and return the total time.
+    match_duration is either a number, or a function that is given a random.Random
+    and returns how long a match takes.
+    """
+    randomizer = random.Random(seed)
+    if not callable(match_duration):
+        duration = match_duration
+        match_duration = lambda __: duration
+    now = 0.0
+    tournament = Tournament(list(range(number_of_competitors)), bracket_reset_finals)
+    scheduler = StationScheduler(tournament, number_of_stations, rest_time, clock=lambda: now)
+    # Matches being played, as (end time, match ID).
+    playing = []
+    while tournament.get_winners() is None:
+        for __, match in scheduler.assign():
+            heapq.heappush(playing, (now + match_duration(randomizer), tournament.get_match_id(match)))
+        next_start_time = None
+        if None in scheduler.get_assignments():
+            next_start_time = scheduler.get_next_start_time()
+        if len(playing) > 0 and (next_start_time is None or playing[0][0] <= next_start_time):
+            now, match_id = heapq.heappop(playing)
+            match = tournament.get_match(match_id)
+            tournament.add_win(match, randomizer.choice(match.get_participants()).get_competitor())
+        elif next_start_time is not None:
+            # Every free station is waiting for competitors to rest.
+            now = max(now, next_start_time)
+    return now
@@ -0,0 +1,234 @@
+"""
+An asyncio service that owns many tournaments, for use behind an async web tier.
+Each tournament has its own lock, and results reported for a tournament while
+a batch is being applied are queued and applied together in the next batch.
+"""
+import asyncio
+
+from double_elimination.tournament import Tournament, MATCH_READY, MATCH_COMPLETED
+
+
+class _Entry:
+    # The state the service keeps for each tournament.
+    __slots__ = (
+        'tournament', 'lock', 'pending_results', 'is_flush_scheduled', 'waiters', 'changed_competitors', 'is_removed',
+    )
+
+    def __init__(self, tournament):
+        self.tournament = tournament
+        self.lock = asyncio.Lock()
+        self.is_removed = False
+        self.pending_results = []
+        self.is_flush_scheduled = False
+        # Futures waiting for a competitor's next match, by competitor.
+        self.waiters = {}
+        # Competitors in matches that were played or became ready since the waiters were checked.
+        self.changed_competitors = set()
+
+
+class TournamentService:
+    """
+    Owns many Tournament instances by ID and offers awaitable operations on them.
+    It must be used from a single event loop.
+    """
+    def __init__(self):
+        self.__entries = {}
+
+    def __repr__(self) -> str:
+        return f'<TournamentService num_tournaments={len(self.__entries)}>'
+
+    def __len__(self):
+        return len(self.__entries)
+
+    async def create(self, tournament_id, competitors_list, bracket_reset_finals=True):
+        """
+        Create a tournament with the given ID, and return it.
+        The tournament is returned for reading only. Its results must be recorded through the service,
+        since the service doesn't know about changes made to it directly.
+        """
+        if tournament_id in self.__entries:
+            raise Exception("Tournament already exists")
+        tournament = Tournament(competitors_list, bracket_reset_finals)
+        entry = _Entry(tournament)
+        tournament.subscribe(lambda event: self.__track_change(entry, event))
+        self.__entries[tournament_id] = entry
+        return tournament
+
+    async def remove(self, tournament_id):
+        """
+        Stop managing a tournament. Results still queued for it and calls
+        waiting for its matches fail with an Exception.
+        """
+        entry = self.__get_entry(tournament_id)
+        async with entry.lock:
+            self.__check_not_removed(entry)
+            del self.__entries[tournament_id]
+            entry.is_removed = True
+            for __, __, future in entry.pending_results:
+                _fail(future, Exception("Tournament was removed"))
+            entry.pending_results = []
+            for futures in entry.waiters.values():
+                for future in futures:
+                    _fail(future, Exception("Tournament was removed"))
+            entry.waiters = {}
+
+    async def add_win(self, tournament_id, match_id, competitor):
+        """
+        Set the victor of a match, given its ID, once the batch it is queued in is applied.
+        Raises an Exception if the match is not ready to be played or the competitor is not in it.
+        """
+        entry = self.__get_entry(tournament_id)
+        future = asyncio.get_running_loop().create_future()
+        entry.pending_results.append((match_id, competitor, future))
+        if not entry.is_flush_scheduled:
+            entry.is_flush_scheduled = True
+            asyncio.ensure_future(self.__flush(entry))
+        await future
+
+    async def active_matches(self, tournament_id):
+        """
+        Returns a list of the IDs of all matches in a tournament that are ready to be played.
+        """
+        entry = self.__get_entry(tournament_id)
+        async with entry.lock:
+            self.__check_not_removed(entry)
+            tournament = entry.tournament
+            return [tournament.get_match_id(match) for match in tournament.get_active_matches()]
+
+    async def wait_for_ready(self, tournament_id, competitor):
+        """
+        Wait until a competitor has a match that is ready to be played and return its ID,
+        or return None if the competitor doesn't play again.
+        """
+        entry = self.__get_entry(tournament_id)
+        async with entry.lock:
+            self.__check_not_removed(entry)
+            result = self.__get_ready_match_id(entry, competitor)
+            if result is not False:
+                return result
+            future = asyncio.get_running_loop().create_future()
+            entry.waiters.setdefault(competitor, []).append(future)
+        return await future
+
+    def __get_entry(self, tournament_id):
+        entry = self.__entries.get(tournament_id)
+        if entry is None:
+            raise Exception("Tournament does not exist")
+        return entry
+
+    def __check_not_removed(self, entry):
+        # An operation can be waiting for the lock while its tournament is removed.
+        if entry.is_removed:
+            raise Exception("Tournament does not exist")
+
+    async def __flush(self, entry):
+        async with entry.lock:
+            pending_results = entry.pending_results
+            entry.pending_results = []
+            entry.is_flush_scheduled = False
+            tournament = entry.tournament
+            # Each result is checked on its own, so an invalid one only fails its own request,
+            # and the valid ones are applied together in one pass.
+            results = []
+            futures = []
+            for match_id, competitor, future in pending_results:
+                try:
+                    match = tournament.get_match(match_id)
+                except Exception as error:
+                    _fail(future, error)
+                    continue
+                results.append((match, competitor))
+                futures.append(future)
+            try:
+                errors = tournament.try_add_wins(results)
+            except Exception as error:
+                # The batch failed as a whole, so every request in it fails with the same error.
+                errors = [error] * len(futures)
+            for future, error in zip(futures, errors):
+                if error is not None:
+                    _fail(future, error)
+                elif not future.done():
+                    future.set_result(None)
+            self.__notify_waiters(entry)
+
+    def __get_ready_match_id(self, entry, competitor):
+        # Returns the ID of the competitor's ready match, None if they don't play again,
+        # or False if they are waiting for an opponent.
+        tournament = entry.tournament
+        match = tournament.get_match_for_competitor(competitor)
+        if match is None:
+            return None
+        if match.is_ready_to_start():
+            return tournament.get_match_id(match)
+        return False
+
+    def __track_change(self, entry, event):
+        __, kind, match = event
+        if (kind == MATCH_READY or kind == MATCH_COMPLETED) and len(entry.waiters) > 0:
+            for participant in match.get_participants():
+                entry.changed_competitors.add(participant.get_competitor())
+
+    def __notify_waiters(self, entry):
+        # Checked after a whole batch, once the tournament is consistent again.
+        changed_competitors = entry.changed_competitors
+        entry.changed_competitors = set()
+        for competitor in changed_competitors:
+            if competitor not in entry.waiters:
+                continue
+            result = self.__get_ready_match_id(entry, competitor)
+            if result is False:
+                continue
+            for future in entry.waiters.pop(competitor):
+                if not future.done():
+                    future.set_result(result)
+
+
+def _fail(future, error):
+    # The caller may have given up on the future already.
+    if not future.done():
+        future.set_exception(error)
+
+
+class LocalTransport:
+    """
+    An in-process stand-in for a network transport in front of a TournamentService.
+    Requests are put on a queue and handled by a worker task, the way a server
+    would handle them off the wire, so they can be used in tests and load tests.
+    """
+    def __init__(self, service, number_of_workers=1):
+        self.__service = service
+        self.__queue = asyncio.Queue()
+        self.__workers = [asyncio.ensure_future(self.__work()) for __ in range(number_of_workers)]
+
+    def __repr__(self) -> str:
+        return f'<LocalTransport num_workers={len(self.__workers)}>'
+
+    async def request(self, operation, *args):
+        """
+        Call a TournamentService operation, such as 'add_win', by name and return its result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.__queue.put((operation, args, future))
+        return await future
+
+    async def close(self):
+        """
+        Stop the worker tasks.
+        """
+        for worker in self.__workers:
+            worker.cancel()
+        await asyncio.gather(*self.__workers, return_exceptions=True)
+
+    async def __work(self):
+        while True:
+            operation, args, future = await self.__queue.get()
+            # Each request runs in its own task, so a slow wait_for_ready doesn't block others.
+            asyncio.ensure_future(self.__handle(operation, args, future))
+
+    async def __handle(self, operation, args, future):
+        try:
+            result = await getattr(self.__service, operation)(*args)
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
@@ -0,0 +1,224 @@
+"""
+A result store for many tournaments in one memory-mapped file, shared between processes.
+Each tournament is a fixed-width record holding its number of competitors, its options,
+a version and one result byte per match, so its bracket topology comes from the
+number of competitors and competitors are referred to by their seed index.
+Writes are coordinated with a lock on the file, so this needs a platform with fcntl.
+"""
+import fcntl
+import mmap
+import os
+import struct
+
+from double_elimination.bracket import get_topology, NOT_PLAYED, LEFT_WON, RIGHT_WON
+from double_elimination.fork import TournamentFork
+from double_elimination.tournament import Tournament
+
+STORE_VERSION = 1
+
+# The file is this header, then a record for each tournament.
+_MAGIC = b'DES'
+_HEADER = struct.Struct('>3sBIII')
+# Each record is this header, then one result byte per match, padded to the record width.
+_RECORD_HEADER = struct.Struct('>IBI')
+_BRACKET_RESET_FINALS_FLAG = 1
+
+
+class SharedResultStore:
+    """
+    Opens or creates a store file. A new store has room for capacity tournaments
+    of up to max_competitors competitors each, an existing store keeps its own sizes.
+    Tournaments are referred to by the IDs create_tournament returns, which count from 0.
+    Reads don't copy the results out of the file, and every process sees each
+    result as soon as it is written.
+    """
+    def __init__(self, path, max_competitors=1024, capacity=1024):
+        self.__file_descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self.__locked(fcntl.LOCK_EX):
+            if os.fstat(self.__file_descriptor).st_size == 0:
+                assert max_competitors > 1 and capacity > 0
+                size = _HEADER.size + capacity * (_RECORD_HEADER.size + 2 * max_competitors)
+                os.ftruncate(self.__file_descriptor, size)
+                os.pwrite(self.__file_descriptor, _HEADER.pack(_MAGIC, STORE_VERSION, max_competitors, capacity, 0), 0)
+            self.__map = mmap.mmap(self.__file_descriptor, 0)
+        magic, version, max_competitors, capacity, __ = _HEADER.unpack_from(self.__map)
+        if magic != _MAGIC or version != STORE_VERSION:
+            raise Exception("Invalid store")
+        self.__max_competitors = max_competitors
+        self.__capacity = capacity
+        self.__record_width = _RECORD_HEADER.size + 2 * max_competitors
+        self.__view = memoryview(self.__map)
+
+    def __repr__(self) -> str:
+        return f'<SharedResultStore num_tournaments={len(self)} capacity={self.__capacity}>'
+
+    def __len__(self):
+        return _HEADER.unpack_from(self.__map)[4]
+
+    def close(self):
+        """
+        Unmap and close the file. Any views from get_results have to be released first.
+        """
+        self.__view.release()
+        self.__map.close()
+        os.close(self.__file_descriptor)
+
+    def create_tournament(self, number_of_competitors, bracket_reset_finals=True):
+        """
+        Add a tournament with nothing played, and return its ID.
+        """
+        assert 1 < number_of_competitors <= self.__max_competitors
+        with self.__locked(fcntl.LOCK_EX):
+            magic, version, max_competitors, capacity, number_of_tournaments = _HEADER.unpack_from(self.__map)
+            if number_of_tournaments == capacity:
+                raise Exception("Store is full")
+            flags = _BRACKET_RESET_FINALS_FLAG if bracket_reset_finals else 0
+            offset = self.__get_offset(number_of_tournaments)
+            _RECORD_HEADER.pack_into(self.__map, offset, number_of_competitors, flags, 0)
+            _HEADER.pack_into(self.__map, 0, magic, version, max_competitors, capacity, number_of_tournaments + 1)
+        return number_of_tournaments
+
+    def get_number_of_competitors(self, tournament_id):
+        """
+        Returns the number of competitors in a tournament.
+        """
+        return self.__read_record_header(tournament_id)[0]
+
+    def get_version(self, tournament_id):
+        """
+        Returns how many results have been written to a tournament,
+        so a process can tell whether its own copy is up to date.
+        """
+        return self.__read_record_header(tournament_id)[2]
+
+    def get_results(self, tournament_id):
+        """
+        Returns a read only memoryview of the result of every match of a tournament, in match ID order,
+        where each byte is NOT_PLAYED, LEFT_WON or RIGHT_WON. It changes as results are written.
+        """
+        topology = self.__get_topology(tournament_id)
+        offset = self.__get_offset(tournament_id) + _RECORD_HEADER.size
+        return self.__view[offset:offset + len(topology)].toreadonly()
+
+    def get_participants(self, tournament_id, match_id):
+        """
+        Returns the seed indexes of the left and right competitors of a match in a list,
+        with None for any that haven't been decided yet.
+        """
+        with self.__locked(fcntl.LOCK_SH):
+            return self.__get_participants(tournament_id, match_id)
+
+    def get_active_match_ids(self, tournament_id):
+        """
+        Returns a list of the IDs of all matches of a tournament that are ready to be played.
+        """
+        topology = self.__get_topology(tournament_id)
+        with self.__locked(fcntl.LOCK_SH):
+            return self.__get_active_match_ids(topology, self.get_results(tournament_id))
+
+    def get_winners(self, tournament_id):
+        """
+        Returns None if the tournament is not done, otherwise
+        returns list of the seed index of the one victor.
+        """
+        with self.__locked(fcntl.LOCK_SH):
+            return self.__get_fork(tournament_id).get_winners()
+
+    def add_win(self, tournament_id, match_id, seed):
+        """
+        Set the victor of a match, given the tournament ID, match ID and the competitor's seed index.
+        """
+        topology = self.__get_topology(tournament_id)
+        offset = self.__get_offset(tournament_id)
+        results_offset = offset + _RECORD_HEADER.size
+        if not isinstance(match_id, int) or not 0 <= match_id < len(topology):
+            raise Exception("Match does not exist")
+        with self.__locked(fcntl.LOCK_EX):
+            results = self.__view[results_offset:results_offset + len(topology)]
+            # Both participants are decided once the matches they come from are played,
+            # so only this match and the matches it takes its participants from are read.
+            left_seed, right_seed = self.__get_participants(tournament_id, match_id)
+            if results[match_id] != NOT_PLAYED or left_seed is None or right_seed is None:
+                raise Exception("Match is not ready to be played")
+            if seed == left_seed:
+                result = LEFT_WON
+            elif seed == right_seed:
+                result = RIGHT_WON
+            else:
+                raise Exception("Invalid competitor")
+            results[match_id] = result
+            # If the incoming winner of the finals match won the finals match, then don't play the reset
+            if match_id == topology.finals_index and topology.bracket_reset_index is not None and result == LEFT_WON:
+                results[topology.bracket_reset_index] = LEFT_WON
+            number_of_competitors, flags, version = _RECORD_HEADER.unpack_from(self.__map, offset)
+            _RECORD_HEADER.pack_into(self.__map, offset, number_of_competitors, flags, version + 1)
+
+    def load_tournament(self, tournament_id, competitors_list):
+        """
+        Returns a new Tournament with the results of a stored tournament,
+        given its competitors in seed order.
+        """
+        number_of_competitors, flags, __ = self.__read_record_header(tournament_id)
+        assert len(competitors_list) == number_of_competitors
+        tournament = Tournament(competitors_list, bool(flags & _BRACKET_RESET_FINALS_FLAG))
+        with self.__locked(fcntl.LOCK_SH):
+            results = bytes(self.get_results(tournament_id))
+        tournament.load_results(results)
+        return tournament
+
+    def __locked(self, operation):
+        return _FileLock(self.__file_descriptor, operation)
+
+    def __get_offset(self, tournament_id):
+        return _HEADER.size + tournament_id * self.__record_width
+
+    def __read_record_header(self, tournament_id):
+        if not 0 <= tournament_id < len(self):
+            raise Exception("Tournament does not exist")
+        return _RECORD_HEADER.unpack_from(self.__map, self.__get_offset(tournament_id))
+
+    def __get_topology(self, tournament_id):
+        number_of_competitors, flags, __ = self.__read_record_header(tournament_id)
+        return get_topology(number_of_competitors, bool(flags & _BRACKET_RESET_FINALS_FLAG))
+
+    def __get_participants(self, tournament_id, match_id):
+        # Participants only depend on the results, so the fork doesn't need the ready matches.
+        return self.__get_fork(tournament_id, ()).get_participants(match_id)
+
+    def __get_fork(self, tournament_id, ready_match_ids=None):
+        # A fork with no changes reads its participants straight from the stored results.
+        topology = self.__get_topology(tournament_id)
+        results = self.get_results(tournament_id)
+        if ready_match_ids is None:
+            ready_match_ids = self.__get_active_match_ids(topology, results)
+        return TournamentFork(topology, range(topology.number_of_competitors), results, ready_match_ids)
+
+    def __get_active_match_ids(self, topology, results):
+        # A match is ready when it hasn't been played and both of its sources
+        # are seeded competitors or come from played matches.
+        number_of_competitors = topology.number_of_competitors
+        active_match_ids = []
+        for match_id, (left_slot, right_slot) in enumerate(topology.sources):
+            if results[match_id] != NOT_PLAYED:
+                continue
+            if left_slot >= number_of_competitors and results[(left_slot - number_of_competitors) // 2] == NOT_PLAYED:
+                continue
+            if right_slot >= number_of_competitors and results[(right_slot - number_of_competitors) // 2] == NOT_PLAYED:
+                continue
+            active_match_ids.append(match_id)
+        return active_match_ids
+
+
+class _FileLock:
+    # A context manager holding a shared or exclusive lock on a whole file.
+    __slots__ = ('__file_descriptor', '__operation')
+
+    def __init__(self, file_descriptor, operation):
+        self.__file_descriptor = file_descriptor
+        self.__operation = operation
+
+    def __enter__(self):
+        fcntl.flock(self.__file_descriptor, self.__operation)
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.__file_descriptor, fcntl.LOCK_UN)
@@ -0,0 +1,284 @@
+"""
+Monte Carlo simulation of a Tournament's outcome.
+Every simulation in a batch is advanced one match at a time as NumPy array operations,
+following the same bracket topology and bracket reset rule as the Tournament,
+and starting from the results that have already been recorded.
+This module needs NumPy, which can be installed with `pip install double_elimination[simulation]`.
+"""
+import multiprocessing
+
+import numpy
+
+from double_elimination.bracket import get_topology, LOSERS_BRACKET, LEFT_WON, RIGHT_WON
+from double_elimination.snapshot import get_results
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Simulations take their random numbers in blocks of this many, each block from its own
+# stream, so the results don't depend on the chunk size or the number of processes.
+# Chunk sizes are rounded up to a multiple of it.
+STREAM_SIZE = 1 << 12
+
+
+class SimulationResults:
+    """
+    The outcome of a set of simulations of a tournament, as probabilities for each competitor.
+    """
+    def __init__(self, competitors, number_of_simulations, wins, top_three, round_labels, rounds):
+        self.__competitors = competitors
+        self.__number_of_simulations = number_of_simulations
+        self.__wins = wins
+        self.__top_three = top_three
+        self.__round_labels = round_labels
+        self.__rounds = rounds
+
+    def __repr__(self) -> str:
+        return f'<SimulationResults number_of_simulations={self.__number_of_simulations}>'
+
+    def get_number_of_simulations(self):
+        """
+        Returns how many simulations were run.
+        """
+        return self.__number_of_simulations
+
+    def get_win_probabilities(self):
+        """
+        Returns a dict of each competitor's probability of winning the tournament.
+        """
+        return self.__to_probabilities(self.__wins)
+
+    def get_top_three_probabilities(self):
+        """
+        Returns a dict of each competitor's probability of finishing in the top three,
+        which are the winner, the loser of the last finals match and the loser of the
+        loser's bracket final.
+        """
+        return self.__to_probabilities(self.__top_three)
+
+    def get_round_probabilities(self):
+        """
+        Returns a dict from each round, as (bracket, round), to a dict of each
+        competitor's probability of playing a match in that round.
+        """
+        return {
+            label: self.__to_probabilities(counts)
+            for label, counts in zip(self.__round_labels, self.__rounds)
+        }
+
+    def __to_probabilities(self, counts):
+        return {
+            competitor: count / self.__number_of_simulations
+            for competitor, count in zip(self.__competitors, counts.tolist())
+        }
+
+
+def simulate(tournament, win_probabilities, number_of_simulations, seed=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Simulate the rest of a tournament many times and return the SimulationResults.
+    win_probabilities is a square matrix (nested lists or an array), in seed order,
+    where win_probabilities[i][j] is the probability that competitor i beats competitor j.
+    The same seed always gives the same results, whatever the chunk size.
+    """
+    competitors = tournament.get_competitors()
+    chunk_size = _get_chunk_size(chunk_size)
+    counts = simulate_counts(
+        len(competitors),
+        tournament.has_bracket_reset_finals(),
+        get_results(tournament),
+        win_probabilities,
+        range(0, number_of_simulations, chunk_size),
+        number_of_simulations,
+        seed,
+        chunk_size,
+    )
+    return SimulationResults(competitors, number_of_simulations, *counts)
+
+
+def simulate_many(jobs, number_of_simulations, seed=None, processes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Simulate many tournaments across a pool of worker processes, given an iterable of
+    (tournament, win_probabilities) jobs, and return a list of SimulationResults in the same order.
+    Workers are only sent the number of competitors, bracket reset option, results and
+    win probabilities of each tournament, and the work is split into chunks of simulations.
+    Each result is the same as calling simulate with the same seed, whatever the number of processes.
+    """
+    descriptions = []
+    for tournament, win_probabilities in jobs:
+        descriptions.append((
+            tournament.get_competitors(),
+            tournament.has_bracket_reset_finals(),
+            get_results(tournament),
+            win_probabilities,
+        ))
+    return _simulate_descriptions(descriptions, number_of_simulations, seed, processes, chunk_size)
+
+
+def simulate_what_if(tournament, win_probabilities, number_of_simulations, seed=None, processes=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    For every match that is ready to be played and each of its participants, simulate the
+    rest of the tournament as if that participant won, across a pool of worker processes.
+    Returns a dict from (match, winning competitor) to SimulationResults.
+    """
+    results = get_results(tournament)
+    scenarios = []
+    descriptions = []
+    for match in tournament.get_active_matches():
+        match_id = tournament.get_match_id(match)
+        for participant, result in zip(match.get_participants(), (LEFT_WON, RIGHT_WON)):
+            scenario_results = bytearray(results)
+            scenario_results[match_id] = result
+            scenarios.append((match, participant.get_competitor()))
+            descriptions.append((
+                tournament.get_competitors(),
+                tournament.has_bracket_reset_finals(),
+                bytes(scenario_results),
+                win_probabilities,
+            ))
+    simulation_results = _simulate_descriptions(descriptions, number_of_simulations, seed, processes, chunk_size)
+    return dict(zip(scenarios, simulation_results))
+
+
+def _simulate_descriptions(descriptions, number_of_simulations, seed, processes, chunk_size):
+    # Every (description, chunk) pair is one task, and the counts are added up per description.
+    chunk_size = _get_chunk_size(chunk_size)
+    tasks = [
+        (
+            description_index, len(competitors), bracket_reset_finals, results, win_probabilities,
+            chunk_start, number_of_simulations, seed, chunk_size,
+        )
+        for description_index, (competitors, bracket_reset_finals, results, win_probabilities) in enumerate(descriptions)
+        for chunk_start in range(0, number_of_simulations, chunk_size)
+    ]
+    totals = [None] * len(descriptions)
+    with multiprocessing.Pool(processes) as pool:
+        for description_index, counts in pool.imap_unordered(_simulate_task, tasks):
+            if totals[description_index] is None:
+                totals[description_index] = counts
+            else:
+                wins, top_three, __, rounds = totals[description_index]
+                wins += counts[0]
+                top_three += counts[1]
+                rounds += counts[3]
+    return [
+        SimulationResults(competitors, number_of_simulations, *counts)
+        for (competitors, __, __, __), counts in zip(descriptions, totals)
+    ]
+
+
+def _simulate_task(task):
+    description_index = task[0]
+    number_of_competitors, bracket_reset_finals, results, win_probabilities, chunk_start = task[1:6]
+    number_of_simulations, seed, chunk_size = task[6:]
+    counts = simulate_counts(
+        number_of_competitors, bracket_reset_finals, results, win_probabilities,
+        [chunk_start], number_of_simulations, seed, chunk_size,
+    )
+    return description_index, counts
+
+
+def simulate_counts(number_of_competitors, bracket_reset_finals, results, win_probabilities,
+                    chunk_starts, number_of_simulations, seed, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Run the chunks of simulations starting at each of chunk_starts, for a bracket described
+    by its number of competitors, bracket reset option and snapshot results.
+    Each block of STREAM_SIZE simulations has its own random stream from the seed and
+    the block's start, so the counts don't depend on how the chunks are split up.
+    Returns (wins, top three, round labels, round counts), where the counts are arrays
+    by seed index and there is one array of round counts per round label.
+    """
+    topology = get_topology(number_of_competitors, bracket_reset_finals)
+    win_probabilities = numpy.asarray(win_probabilities, dtype=numpy.float64)
+    assert win_probabilities.shape == (number_of_competitors, number_of_competitors)
+    round_labels, match_rounds = _get_rounds(topology)
+    wins = numpy.zeros(number_of_competitors, dtype=numpy.int64)
+    top_three = numpy.zeros(number_of_competitors, dtype=numpy.int64)
+    rounds = numpy.zeros((len(round_labels), number_of_competitors), dtype=numpy.int64)
+    seed_sequence = numpy.random.SeedSequence(seed)
+    chunk_size = _get_chunk_size(chunk_size)
+    for chunk_start in chunk_starts:
+        chunk_end = min(chunk_start + chunk_size, number_of_simulations)
+        streams = [
+            (
+                numpy.random.default_rng(numpy.random.SeedSequence(seed_sequence.entropy, spawn_key=(stream_start,))),
+                min(STREAM_SIZE, chunk_end - stream_start),
+            )
+            for stream_start in range(chunk_start, chunk_end, STREAM_SIZE)
+        ]
+        _simulate_chunk(
+            topology, results, win_probabilities, chunk_end - chunk_start, streams, match_rounds, wins, top_three,
+            rounds,
+        )
+    return wins, top_three, round_labels, rounds
+
+
+def _get_chunk_size(chunk_size):
+    return -(-chunk_size // STREAM_SIZE) * STREAM_SIZE
+
+
+def _get_rounds(topology):
+    # Returns the (bracket, round) labels, and the index of each match's label.
+    labels = []
+    match_rounds = []
+    for match_index in range(len(topology)):
+        bracket, round_number, __ = topology.get_match_label(match_index)
+        if len(labels) == 0 or labels[-1] != (bracket, round_number):
+            labels.append((bracket, round_number))
+        match_rounds.append(len(labels) - 1)
+    return labels, match_rounds
+
+
+def _simulate_chunk(topology, results, win_probabilities, size, streams, match_rounds, wins, top_three, rounds):
+    # streams is a list of (random generator, number of simulations) for consecutive blocks of the chunk.
+    number_of_competitors = topology.number_of_competitors
+    number_of_slots = number_of_competitors + 2 * len(topology)
+    # Each row holds the competitor in a slot, as a seed index, for every simulation.
+    slots = numpy.empty((number_of_slots, size), dtype=numpy.int32)
+    slots[:number_of_competitors] = numpy.arange(number_of_competitors, dtype=numpy.int32)[:, None]
+    last_losers_match = max(
+        (first_index + count - 1 for bracket, first_index, count in topology.rounds if bracket == LOSERS_BRACKET),
+        default=None,
+    )
+    slot = number_of_competitors
+    for match_index, (left_slot, right_slot) in enumerate(topology.sources):
+        left = slots[left_slot]
+        right = slots[right_slot]
+        if results[match_index] == LEFT_WON:
+            left_wins = numpy.ones(size, dtype=bool)
+        elif results[match_index] == RIGHT_WON:
+            left_wins = numpy.zeros(size, dtype=bool)
+        else:
+            left_wins = _draw(streams) < win_probabilities[left, right]
+        played = None
+        if match_index == topology.bracket_reset_index:
+            # The bracket reset is only played when the loser's bracket
+            # winner won the finals, otherwise the finals winner wins it too.
+            played = left != slots[topology.sources[topology.finals_index][0]]
+            left_wins |= ~played
+        winner = numpy.where(left_wins, left, right)
+        loser = numpy.where(left_wins, right, left)
+        slots[slot] = winner
+        slots[slot + 1] = loser
+        slot += 2
+
+        round_counts = rounds[match_rounds[match_index]]
+        if played is None:
+            round_counts += numpy.bincount(left, minlength=number_of_competitors)
+            round_counts += numpy.bincount(right, minlength=number_of_competitors)
+        else:
+            round_counts += numpy.bincount(left[played], minlength=number_of_competitors)
+            round_counts += numpy.bincount(right[played], minlength=number_of_competitors)
+        if match_index == last_losers_match:
+            top_three += numpy.bincount(loser, minlength=number_of_competitors)
+
+    # The last match decides the winner and the runner up.
+    wins += numpy.bincount(winner, minlength=number_of_competitors)
+    top_three += numpy.bincount(winner, minlength=number_of_competitors)
+    top_three += numpy.bincount(loser, minlength=number_of_competitors)
+
+
+def _draw(streams):
+    # Each block draws from its own stream, so a block draws the same numbers in any chunk.
+    if len(streams) == 1:
+        random, size = streams[0]
+        return random.random(size)
+    return numpy.concatenate([random.random(size) for random, size in streams])
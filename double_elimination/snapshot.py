@@ -0,0 +1,115 @@
+"""
+Snapshots save the state of a Tournament so it can be restored later,
+for example after a process restart, without replaying every add_win call.
+There is a compact binary form and a JSON form. Both store the competitors
+in seed order and one result per match, and competitors have to come back from JSON
+unchanged, such as strings and numbers.
+"""
+import json
+import struct
+
+from double_elimination.tournament import Tournament
+
+SNAPSHOT_VERSION = 1
+
+# Binary snapshots are this header, then the competitors as a JSON list,
+# then one result byte per match.
+_MAGIC = b'DET'
+_HEADER = struct.Struct('>3sBBI')
+_BRACKET_RESET_FINALS_FLAG = 1
+
+
+def get_results(tournament):
+    """
+    Return the result of every match in the tournament as bytes, in match ID order.
+    """
+    return tournament.get_results()
+
+
+def check_competitors(competitors):
+    """
+    Raise an Exception if the competitors wouldn't be restored from a snapshot as they are,
+    for example because they aren't JSON serializable, or are tuples, which come back as lists.
+    Returns the competitors as JSON.
+    """
+    try:
+        encoded_competitors = json.dumps(list(competitors), separators=(',', ':'))
+    except (TypeError, ValueError):
+        encoded_competitors = None
+    if encoded_competitors is None or json.loads(encoded_competitors) != list(competitors):
+        raise Exception("Competitors can't be stored in a snapshot")
+    return encoded_competitors
+
+
+def dump_snapshot(tournament):
+    """
+    Return a binary snapshot of the tournament.
+    """
+    competitors = check_competitors(tournament.get_competitors()).encode('utf-8')
+    flags = _BRACKET_RESET_FINALS_FLAG if tournament.has_bracket_reset_finals() else 0
+    header = _HEADER.pack(_MAGIC, SNAPSHOT_VERSION, flags, len(competitors))
+    return header + competitors + get_results(tournament)
+
+
+def load_snapshot(snapshot, version=0):
+    """
+    Return a new Tournament restored from a binary snapshot, starting from the given version
+    (see Tournament.load_results).
+    Raises an Exception if the snapshot is invalid.
+    """
+    if len(snapshot) < _HEADER.size:
+        raise Exception("Invalid snapshot")
+    magic, snapshot_version, flags, competitors_length = _HEADER.unpack_from(snapshot)
+    if magic != _MAGIC or snapshot_version != SNAPSHOT_VERSION:
+        raise Exception("Invalid snapshot")
+    results_start = _HEADER.size + competitors_length
+    try:
+        competitors = json.loads(snapshot[_HEADER.size:results_start].decode('utf-8'))
+    except ValueError:
+        # Both JSONDecodeError and UnicodeDecodeError are ValueErrors.
+        raise Exception("Invalid snapshot") from None
+    bracket_reset_finals = bool(flags & _BRACKET_RESET_FINALS_FLAG)
+    return _restore(competitors, bracket_reset_finals, snapshot[results_start:], version)
+
+
+def dump_json_snapshot(tournament):
+    """
+    Return a JSON snapshot of the tournament as a string.
+    """
+    check_competitors(tournament.get_competitors())
+    return json.dumps({
+        'version': SNAPSHOT_VERSION,
+        'bracket_reset_finals': tournament.has_bracket_reset_finals(),
+        'competitors': tournament.get_competitors(),
+        'results': list(get_results(tournament)),
+    }, separators=(',', ':'))
+
+
+def load_json_snapshot(snapshot):
+    """
+    Return a new Tournament restored from a JSON snapshot string.
+    Raises an Exception if the snapshot is invalid.
+    """
+    try:
+        data = json.loads(snapshot)
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise Exception("Invalid snapshot")
+        competitors = data['competitors']
+        bracket_reset_finals = data['bracket_reset_finals']
+        results = data['results']
+    except (ValueError, AttributeError, KeyError, TypeError):
+        raise Exception("Invalid snapshot") from None
+    if not isinstance(bracket_reset_finals, bool):
+        raise Exception("Invalid snapshot")
+    return _restore(competitors, bracket_reset_finals, results)
+
+
+def _restore(competitors, bracket_reset_finals, results, version=0):
+    if not isinstance(competitors, list) or len(competitors) < 2:
+        raise Exception("Invalid snapshot")
+    try:
+        tournament = Tournament(competitors, bracket_reset_finals)
+        tournament.load_results(results, version)
+    except Exception:
+        raise Exception("Invalid snapshot") from None
+    return tournament
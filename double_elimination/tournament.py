@@ -1,12 +1,26 @@
 """
 This defines a double elimination 'Tournament' object.
 """
-import math
+import contextlib
 import itertools
+import logging
+import threading
 
+from double_elimination.bracket import get_topology, NOT_PLAYED, LEFT_WON, RIGHT_WON
+from double_elimination.fork import TournamentFork
+from double_elimination.journal import CLEARED
 from double_elimination.match import Match
 from double_elimination.participant import Participant
 
+# The kinds of events passed to subscribers and returned by get_changes_since.
+MATCH_READY = 'match_ready'
+MATCH_NOT_READY = 'match_not_ready'
+MATCH_COMPLETED = 'match_completed'
+MATCH_CLEARED = 'match_cleared'
+TOURNAMENT_WON = 'tournament_won'
+
+_logger = logging.getLogger(__name__)
+
 class Tournament:
     """
     This is a double-elimination tournament where each match is between 2 competitors.
@@ -14,159 +28,80 @@ class Tournament:
     they lose again or they make it to the final match against the winner of the winners bracket.
     It does not handle a second "grand finals" match, that should be handled outside of this object.
     It takes in a list of competitors, which can be strings or any type of Python object,
-    but they should be unique. They should be ordered by a seed, with the first entry being the most
+    but they must be unique and hashable. They should be ordered by a seed, with the first entry being the most
     skilled and the last being the least. They can also be randomized before creating the instance.
     Optional options dict fields:
+    With thread_safe=True, results for different matches can be recorded from many threads at once.
+    Recording a result only locks the match and the matches its winner and loser go on to play,
+    so independent matches don't wait for each other, while add_wins and revert_win lock every match.
+    The tournament can be read from other threads meanwhile, and readers always see whole results.
+    Event callbacks are called one at a time, once the change that caused the events is complete,
+    and must not record or revert results themselves. An exception raised by a callback is logged,
+    and doesn't stop the other callbacks or the change.
     """
-    def __init__(self, competitors_list, bracket_reset_finals=True):
+    def __init__(self, competitors_list, bracket_reset_finals=True, thread_safe=False):
         # Only tournaments with 2 or more competitors are valid.
         assert len(competitors_list) > 1
-        self.__matches = []
+        self.__competitors = list(competitors_list)
         self.__bracket_reset_finals = bracket_reset_finals
-        # Find minimum 'n' such that 2^n >= number of competitors
-        next_higher_power_of_two = int(math.pow(2, math.ceil(math.log2(len(competitors_list)))))
-        # Since the bracket is fundamentally a binary tree with 2^n nodes,
-        # assign the winners enough byes to fill out the 2^n slots.
-        winners_number_of_byes = next_higher_power_of_two - len(competitors_list)
-        # Create participants for first round (real and empty)
-        incoming_participants = list(map(Participant, competitors_list))
-        incoming_participants.extend([None] * winners_number_of_byes)
-        # Keep track of the participants at the end of the winner's and
-        # loser's brackets. Later, we will assemble these into the finals match.
-        last_winner = None
-        last_loser = None
-
-        losers_by_round = []
-        while len(incoming_participants) > 1:
-            losers = []
-            # Split participants into best and worst
-            half_length = int(len(incoming_participants)/2)
-            first = incoming_participants[0:half_length]
-            last = incoming_participants[half_length:]
-            last.reverse()
-
-            next_round_participants = []
-            for participant_pair in zip(first, last):
-                # If we have only one participant, send that participant
-                # directly to the next round.
-                if participant_pair[1] is None:
-                    next_round_participants.append(participant_pair[0])
-                elif participant_pair[0] is None:
-                    next_round_participants.append(participant_pair[1])
-                # If we have two participants, generate a match and send
-                # the winner of the match to the next winner's round,
-                # and the loser of the match to the loser's bracket.
-                else:
-                    match = Match(participant_pair[0], participant_pair[1])
-                    next_round_participants.append(match.get_winner_participant())
-                    last_winner = match.get_winner_participant()
-                    losers.append(match.get_loser_participant())
-                    self.__matches.append(match)
-            # If we have any losers, create a new losers round.
-            # This condition means there will be no empty loser's rounds.
-            if len(losers) > 0:
-                losers_by_round.append(losers)
-            incoming_participants = next_round_participants
-
-        # If we gave anybody bye's in the winner's bracket and there are
-        # more than 1 loser's bracket rounds, then skip the first loser's
-        # bracket round and merge it with the second loser's bracket round.
-        if winners_number_of_byes > 0 and len(losers_by_round) > 1:
-            losers_by_round[1].extend(losers_by_round[0])
-            losers_by_round = losers_by_round[1:]
-
-        # Mix in empty rounds to the loser's bracket. This gives extra 'room'
-        # such that we can sufficiently thin out the loser's bracket
-        # to match the number of incoming participants from the winner's
-        # bracket in each round.
-        # Rationale: For any round beyond the first, the loser's brakcet will 
-        # receive 'n' participants from the previous round of the winner's
-        # bracket and the loser's bracket. In the next round, we will receive
-        # 'n/2' participants from the winner's bracket. Thus, we need to trim
-        # down the loser's bracket by a factor of 4, which will take 2 rounds.
-        empty_by_round = []
-        for __ in losers_by_round:
-            empty_by_round.append([])
-        losers_by_round = list(itertools.chain(*zip(losers_by_round, empty_by_round)))
-        # If there are more than 2 loser's bracket rounds, then
-        # remove the 1st empty round from the loser's bracket and keep the rest.
-        # Effectively, this disables the thinning for round 1.
-        # Round 1 is a special case because it is the ONLY round of the loser's
-        # bracket where we ONLY receive participants from the winner's bracket.
-        if len(losers_by_round) > 2:
-            new_losers = [losers_by_round[0]]
-            new_losers.extend(losers_by_round[2:])
-            losers_by_round = new_losers
-
-        # Reverse participants every 4 loser's bracket rounds.
-        for loser_round in range(0, len(losers_by_round), 4):
-            losers_by_round[loser_round].reverse()
-
-        # Create loser's bracket using loser participants from winner's bracket.
-        index = 0
-        incoming_participants = []
-        for losers in losers_by_round:
-            incoming_participants = losers
-
-            if len(incoming_participants) > 1:
-                # Find minimum 'n' such that 
-                # 2^n < number of participants in this round.
-                next_higher_power_of_two = int(math.pow(2, math.ceil(math.log2(len(incoming_participants)))))
-                # Since every round has a different number of matches
-                # in the winners bracket ( non-trivial due to winner's byes),
-                # we compute the number of bye's in the loser's bracket
-                # on a per-round basis.
-                number_of_byes = next_higher_power_of_two - len(incoming_participants)
-                incoming_participants.extend([None] * number_of_byes)
-                # Loser's bracket is also seeded so match top competitors
-                # with bottom competitors
-                half_length = math.ceil(len(incoming_participants)/2)
-                first = incoming_participants[0:half_length]
-                last = incoming_participants[half_length:]
-                last.reverse()
-
-                incoming_participants = []
-                for participant_pair in zip(first, last):
-                    # If we have only one participant, send that participant
-                    # directly to the next round.
-                    if participant_pair[0] is None:
-                        incoming_participants.append(participant_pair[1])
-                    elif participant_pair[1] is None:
-                        incoming_participants.append(participant_pair[0])
-                    else:
-                        # If we have two participants, generate a match and send
-                        # the winner of the match to the next loser's round,
-                        match = Match(participant_pair[0], participant_pair[1])
-                        incoming_participants.append(match.get_winner_participant())
-                        self.__matches.append(match)
-                if len(incoming_participants) > 0:
-                    # If this is the last round
-                    if len(losers_by_round) <= index + 1:
-                        # Create a new round.
-                        losers_by_round.append(incoming_participants)
-                    # Otherwise, if there is another round
-                    else:
-                        # Send our (outputted) participants to that round.
-                        losers_by_round[index + 1].extend(incoming_participants)
-            # If there are 0 or 1 participants in this round, and there is
-            # a future round, send the participants there.
-            elif len(losers_by_round) > index + 1:
-                losers_by_round[index + 1].extend(incoming_participants)
-            # If this round only has 1 participant, then set this participant
-            # as the winner of the loser's bracket.
-            if len(incoming_participants) == 1:
-                last_loser = incoming_participants[0]
-            index += 1
-
-        # Generate finals match.
-        # Important: the incoming winner should always be the first participant to determine bracket reset
-        finals_match = Match(last_winner, last_loser)
-        self.__matches.append(finals_match)
+        self.__journal = None
+        self.__events = []
+        # The version the events start after, which is only above 0 if results were loaded at a version.
+        self.__first_version = 0
+        # The events of the change being made, which are published once it is complete.
+        self.__pending_events = []
+        self.__number_of_delivered_events = 0
+        self.__subscribers = []
+        # The shape of the bracket only depends on the number of competitors,
+        # so it comes from a shared cache and we just bind the competitors into it.
+        topology = get_topology(len(competitors_list), bracket_reset_finals)
+        self.__topology = topology
+        slots = list(map(Participant, competitors_list))
+        number_of_competitors = len(slots)
+        # Competitors are only hashed here and when they are passed in. Inside, each one is
+        # its seed index (its handle), so results never call a competitor's __eq__.
+        self.__handle_by_competitor = {competitor: handle for handle, competitor in enumerate(self.__competitors)}
+        if len(self.__handle_by_competitor) != number_of_competitors:
+            raise Exception("Competitors must be unique")
+        # The handle of the competitor in each participant slot, or None if it isn't decided yet.
+        self.__handles = list(range(number_of_competitors)) + [None] * (2 * len(topology))
+        # The participant slot each competitor currently holds, by handle.
+        self.__participant_by_handle = slots[:]
+        # Every match's winner and loser placeholders take the next two slots,
+        # so they can all be made up front and the matches made from the slots.
+        sources = topology.sources
+        placeholders = [Participant() for __ in range(2 * len(sources))]
+        slots += placeholders
+        left_participants = [slots[left_slot] for left_slot, __ in sources]
+        right_participants = [slots[right_slot] for __, right_slot in sources]
+        matches = list(map(Match, left_participants, right_participants, placeholders[0::2], placeholders[1::2]))
+        self.__matches = matches
+        # Every placeholder participant feeds at most one later match.
+        # Keep track of where each one goes so that a result only has to
+        # look at the one or two matches it feeds, and keep a live set of
+        # the matches that are ready to be played (a dict keeps it ordered).
+        # At the start, those are the matches between two seeded competitors.
+        next_match_by_participant = dict(zip(left_participants, matches))
+        next_match_by_participant.update(zip(right_participants, matches))
+        self.__next_match_by_participant = next_match_by_participant
+        self.__ready_matches = {
+            match: None for match, (left_slot, right_slot) in zip(matches, sources)
+            if left_slot < number_of_competitors and right_slot < number_of_competitors
+        }
+        # A match's ID is its position in the list of matches.
+        self.__match_ids = dict(zip(matches, range(len(matches))))
+        self.__results = bytearray(len(matches))
+        # Reentrant, since the bracket reset is resolved while the finals' locks are held.
+        self.__locks = [threading.RLock() for __ in matches] if thread_safe else None
+        # Held while a change is made to the tournament's state, so changes are made one at a time,
+        # and while it is read, so readers never see a change half made.
+        self.__commit_lock = threading.RLock() if thread_safe else contextlib.nullcontext()
+        self.__events_lock = threading.Lock() if thread_safe else None
+
+        finals_match = matches[topology.finals_index]
         self.__finals_match = finals_match
-        
         if bracket_reset_finals:
-            bracket_reset_finals_match = Match(finals_match.get_winner_participant(), finals_match.get_loser_participant())
-            self.__matches.append(bracket_reset_finals_match)
+            bracket_reset_finals_match = matches[topology.bracket_reset_index]
             # The winner of the overall tournament is the winner of the
             # bracket reset finals match.
             self.__winner = bracket_reset_finals_match.get_winner_participant()
@@ -185,8 +120,11 @@ class Tournament:
     def get_active_matches(self):
         """
         Returns a list of all matches that are ready to be played.
+        This is kept up to date by add_win, so results should be
+        recorded through the tournament rather than on the Match directly.
         """
-        return [match for match in self.get_matches() if match.is_ready_to_start()]
+        with self.__commit_lock:
+            return list(self.__ready_matches)
 
     def get_matches(self):
         """
@@ -194,40 +132,618 @@ class Tournament:
         """
         return self.__matches
 
+    def get_competitors(self):
+        """
+        Returns the list of competitors the tournament was created with, in seed order.
+        """
+        return self.__competitors
+
+    def has_bracket_reset_finals(self):
+        """
+        Returns True if the tournament was created with a bracket reset finals match.
+        """
+        return self.__bracket_reset_finals
+
+    def get_results(self):
+        """
+        Returns the result of every match as bytes, in match ID order,
+        where each byte is NOT_PLAYED, LEFT_WON or RIGHT_WON.
+        """
+        with self.__commit_lock:
+            return bytes(self.__results)
+
+    def fork(self):
+        """
+        Returns a TournamentFork, a lightweight copy of the tournament's current state
+        for trying out results without changing this tournament.
+        """
+        with self.__commit_lock:
+            ready_match_ids = [self.__match_ids[match] for match in self.__ready_matches]
+            results = bytes(self.__results)
+        return TournamentFork(
+            self.__topology, self.__competitors, results, ready_match_ids,
+            handle_by_competitor=self.__handle_by_competitor, match_ids=self.__match_ids,
+        )
+
+    def get_match(self, match_id):
+        """
+        Returns the Match with the given ID.
+        IDs are the positions of the matches in get_matches,
+        so they are the same for every tournament with the same number of competitors.
+        Raises an Exception if there is no match with the ID.
+        """
+        # Negative IDs would otherwise count back from the end of the list.
+        if not isinstance(match_id, int) or not 0 <= match_id < len(self.__matches):
+            raise Exception("Match does not exist")
+        return self.__matches[match_id]
+
+    def get_match_id(self, match):
+        """
+        Returns the ID of a Match in this tournament.
+        """
+        return self.__match_ids[match]
+
+    def get_match_label(self, match):
+        """
+        Returns where a Match is in the bracket as (bracket, round, slot),
+        where bracket is 'winners', 'losers' or 'finals' and round and slot count from 0.
+        """
+        return self.__topology.get_match_label(self.__match_ids[match])
+
     def get_active_matches_for_competitor(self, competitor):
         """
         Given the string or object of the competitor that was supplied
         when creating the tournament instance,
         returns a list of Match's that they are currently playing in.
         """
-        matches = []
-        for match in self.get_active_matches():
-            competitors = [participant.get_competitor() for participant in match.get_participants()]
-            if competitor in competitors:
-                matches.append(match)
-        return matches
+        with self.__commit_lock:
+            match = self.get_match_for_competitor(competitor)
+            if match is not None and match in self.__ready_matches:
+                return [match]
+            return []
+
+    def get_match_for_competitor(self, competitor):
+        """
+        Given the string or object of the competitor that was supplied
+        when creating the tournament instance, returns the Match they are
+        playing now or will play next once their opponent is decided.
+        Returns None if they have been eliminated or the tournament is over.
+        """
+        handle = self.__handle_by_competitor.get(competitor)
+        if handle is None:
+            return None
+        with self.__commit_lock:
+            return self.__next_match_by_participant.get(self.__participant_by_handle[handle])
+
+    def get_next_matches(self, match):
+        """
+        Returns the matches that the winner and the loser of the given match
+        go on to play, as a list of [winner's match, loser's match].
+        Either entry is None if that participant doesn't play again.
+        """
+        return [
+            self.__next_match_by_participant.get(match.get_winner_participant()),
+            self.__next_match_by_participant.get(match.get_loser_participant()),
+        ]
 
     def get_winners(self):
         """
         Returns None if the tournament is done, otherwise
         returns list of the one victor.
         """
-        if len(self.get_active_matches()) > 0:
-            return None
-        return [self.__winner.get_competitor()]
+        with self.__commit_lock:
+            if len(self.__ready_matches) > 0:
+                return None
+            return [self.__winner.get_competitor()]
+
+    def add_win_by_id(self, match_id, competitor):
+        """
+        Set the victor of a match, given the competitor string/object and match ID.
+        """
+        self.add_win(self.get_match(match_id), competitor)
 
     def add_win(self, match, competitor):
         """
         Set the victor of a match, given the competitor string/object and match.
+        Raises an Exception, without changing anything, if the match is not ready to be played.
+        """
+        if match not in self.__match_ids:
+            raise Exception("Match is not in this tournament")
+        if self.__locks is not None:
+            locks = self.__acquire(match)
+            try:
+                self.__add_win(match, competitor)
+            finally:
+                self.__release(locks)
+        else:
+            self.__add_win(match, competitor)
+        self.__deliver()
+
+    def add_wins(self, results):
+        """
+        Set the victors of many matches at once, given an iterable of (match, competitor) pairs.
+        The results can be in any order, they are applied in bracket order,
+        and every match must be ready to be played when its result is applied.
+        The whole batch is checked first, so if a result is invalid,
+        an Exception is raised and none of the results are applied.
+        Returns a list of the matches that became ready to be played.
+        """
+        results = list(results)
+        for match, __ in results:
+            if match not in self.__match_ids:
+                raise Exception("Match is not in this tournament")
+        results.sort(key=lambda result: self.__match_ids[result[0]])
+        return self.__apply_wins(results, False)
+
+    def try_add_wins(self, results):
+        """
+        Like add_wins, but an invalid result is skipped instead of failing the whole batch,
+        along with any results in the batch that needed it, and the rest are applied.
+        Returns a list with None for each result that was applied,
+        or the Exception it failed with, in the order the results were given.
+        """
+        results = list(results)
+        errors = [None] * len(results)
+        positions = []
+        for position, (match, __) in enumerate(results):
+            if match in self.__match_ids:
+                positions.append(position)
+            else:
+                errors[position] = Exception("Match is not in this tournament")
+        positions.sort(key=lambda position: self.__match_ids[results[position][0]])
+        sorted_errors = [None] * len(positions)
+        self.__apply_wins([results[position] for position in positions], False, sorted_errors)
+        for position, error in zip(positions, sorted_errors):
+            errors[position] = error
+        return errors
+
+    def add_wins_by_side(self, results):
+        """
+        Like add_wins, but given an iterable of (match ID, winner index) pairs,
+        where the winner index is the position of the winner in the match's get_participants.
+        This allows giving results for matches whose participants are not decided yet.
         """
-        match.set_winner(competitor)
+        results = sorted(results, key=lambda result: result[0])
+        for match_id, winner_index in results:
+            if not 0 <= match_id < len(self.__matches) or winner_index not in (0, 1):
+                raise Exception("Invalid result")
+        return self.__apply_wins(
+            [(self.__matches[match_id], winner_index) for match_id, winner_index in results], True
+        )
+
+    def replay(self, journal_records):
+        """
+        Apply the (match ID, winner index) records read from a result journal.
+        This should be done before calling set_journal, so the records aren't written again.
+        Returns a list of the matches that became ready to be played.
+        """
+        # Every match stays locked, so no other thread changes which matches are ready meanwhile.
+        locks = self.__acquire_all()
+        try:
+            previously_ready_matches = set(self.__ready_matches)
+            # Results are applied in batches, up to each reverted result.
+            results = []
+            for match_id, winner_index in journal_records:
+                if winner_index == CLEARED:
+                    self.add_wins_by_side(results)
+                    results = []
+                    self.revert_win(self.get_match(match_id))
+                else:
+                    results.append((match_id, winner_index))
+            self.add_wins_by_side(results)
+            return [match for match in self.__ready_matches if match not in previously_ready_matches]
+        finally:
+            self.__release(locks)
+
+    def load_results(self, results, version=0):
+        """
+        Set the result of every match at once on a tournament that has no results yet,
+        given them in match ID order as NOT_PLAYED, LEFT_WON or RIGHT_WON, like get_results returns.
+        This is much quicker than recording the results one at a time, as it doesn't record
+        events or journal records, so the tournament's version starts from the loaded results.
+        Pass the version the results were saved at to carry on counting from it.
+        Raises an Exception without changing anything if the results are invalid.
+        """
+        topology = self.__topology
+        results = bytearray(results)
+        if len(results) != len(self.__matches) or len(self.__events) > 0 or any(self.__results):
+            raise Exception("Invalid results")
+        if not isinstance(version, int) or version < 0:
+            raise Exception("Invalid version")
+        # If the incoming winner won the finals, the bracket reset was decided with it.
+        if self.__bracket_reset_finals and results[topology.finals_index] == LEFT_WON:
+            if results[topology.bracket_reset_index] == RIGHT_WON:
+                raise Exception("Invalid results")
+            results[topology.bracket_reset_index] = LEFT_WON
+        locks = self.__acquire_all()
+        try:
+            self.__commit(self.__load_results, results, version)
+        finally:
+            self.__release(locks)
+
+    def __load_results(self, results, version):
+        topology = self.__topology
+        number_of_competitors = topology.number_of_competitors
+        # Work out every slot's handle on a copy first, in match ID order, so each match's
+        # participants are known when it is reached. A played match must have both of them.
+        handles = self.__handles[:]
+        ready_matches = {}
+        winner_slot = number_of_competitors
+        for match, (left_slot, right_slot), result in zip(self.__matches, topology.sources, results):
+            left_handle = handles[left_slot]
+            right_handle = handles[right_slot]
+            if result == NOT_PLAYED:
+                if left_handle is not None and right_handle is not None:
+                    ready_matches[match] = None
+            elif left_handle is None or right_handle is None:
+                raise Exception("Invalid results")
+            elif result == LEFT_WON:
+                handles[winner_slot] = left_handle
+                handles[winner_slot + 1] = right_handle
+            elif result == RIGHT_WON:
+                handles[winner_slot] = right_handle
+                handles[winner_slot + 1] = left_handle
+            else:
+                raise Exception("Invalid results")
+            winner_slot += 2
+        # Then fill in the placeholders of the played matches. Going in slot order,
+        # each competitor ends up at the last slot they hold.
+        competitors = self.__competitors
+        participant_by_handle = self.__participant_by_handle
+        for match, winner_handle, loser_handle in zip(
+            self.__matches, handles[number_of_competitors::2], handles[number_of_competitors + 1::2]
+        ):
+            if winner_handle is not None:
+                winner = match.get_winner_participant()
+                loser = match.get_loser_participant()
+                winner.set_competitor(competitors[winner_handle])
+                loser.set_competitor(competitors[loser_handle])
+                participant_by_handle[winner_handle] = winner
+                participant_by_handle[loser_handle] = loser
+        self.__handles = handles
+        self.__ready_matches = ready_matches
+        self.__results[:] = results
+        self.__first_version = version
+
+    def revert_win(self, match):
+        """
+        Clear the result of a match that has been played, along with the results
+        of any later matches that the winner or loser of the match went on to play.
+        A bracket reset that was decided automatically can't be reverted on its own,
+        revert the finals instead.
+        Returns a list of the matches whose results were cleared, in bracket order.
+        """
+        if match not in self.__match_ids:
+            raise Exception("Match is not in this tournament")
+        locks = self.__acquire_all()
+        try:
+            cleared_matches = self.__commit(self.__revert_win, match)
+        finally:
+            self.__release(locks)
+        self.__deliver()
+        return cleared_matches
+
+    def correct_win(self, match, competitor):
+        """
+        Replace the result of a match that has been played, clearing the results
+        of any later matches that depended on it.
+        A bracket reset that was decided automatically can't be corrected on its own,
+        correct the finals instead.
+        Returns a list of the matches whose results were cleared, in bracket order.
+        """
+        if match not in self.__match_ids:
+            raise Exception("Match is not in this tournament")
+        locks = self.__acquire_all()
+        try:
+            # Check the new winner before clearing anything. The match keeps its participants when reverted.
+            left_slot, right_slot = self.__topology.sources[self.__match_ids[match]]
+            winner_index = self.__get_winner_index(competitor, self.__handles[left_slot], self.__handles[right_slot])
+            cleared_matches = self.__commit(self.__correct_win, match, winner_index)
+        finally:
+            self.__release(locks)
+        self.__deliver()
+        return cleared_matches
+
+    def subscribe(self, callback):
+        """
+        Call callback(event) for every change to the tournament from now on.
+        An event is a (version, kind, match) tuple, where kind is MATCH_READY, MATCH_NOT_READY,
+        MATCH_COMPLETED, MATCH_CLEARED or TOURNAMENT_WON, and match is the match it is about
+        (the last match played, for TOURNAMENT_WON).
+        """
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling a callback that was passed to subscribe.
+        """
+        self.__subscribers.remove(callback)
+
+    def get_version(self):
+        """
+        Returns the version of the tournament, which is the number of events so far.
+        A new tournament is version 0, with the matches from get_active_matches ready.
+        """
+        return self.__first_version + len(self.__events)
+
+    def get_changes_since(self, version):
+        """
+        Returns a list of the events after a version, in order,
+        so a copy of the tournament's state can be brought up to date.
+        Raises an Exception if the version is from before the results were loaded,
+        since those events aren't kept.
+        """
+        if version < self.__first_version:
+            raise Exception("Changes before the loaded results are not kept")
+        return self.__events[version - self.__first_version:]
+
+    def set_journal(self, journal):
+        """
+        Record every result from now on to a ResultJournal, including
+        bracket reset finals matches that are decided automatically.
+        Pass None to stop recording.
+        """
+        self.__journal = journal
+
+    def __revert_win(self, match):
+        if match.get_winner_participant().get_competitor() is None:
+            raise Exception("Match has not been played")
+        # It would only be decided again straight away, since it follows from the finals.
+        topology = self.__topology
+        if self.__match_ids[match] == topology.bracket_reset_index and self.__results[topology.finals_index] == LEFT_WON:
+            raise Exception("Bracket reset was decided by the finals")
+        if self.__journal is not None:
+            self.__journal.append(self.__match_ids[match], CLEARED)
+        # Only walk the matches fed by this one, stopping at matches that haven't been played.
+        # The finals feeds both participants of the bracket reset, so keep track of what's been seen.
+        cleared_matches = {match: None}
+        unplayed_matches = []
+        pending_matches = [match]
+        while len(pending_matches) > 0:
+            pending_match = pending_matches.pop()
+            for participant in (pending_match.get_winner_participant(), pending_match.get_loser_participant()):
+                next_match = self.__next_match_by_participant.get(participant)
+                if next_match is None or next_match in cleared_matches:
+                    continue
+                if next_match.get_winner_participant().get_competitor() is None:
+                    unplayed_matches.append(next_match)
+                else:
+                    cleared_matches[next_match] = None
+                    pending_matches.append(next_match)
+        cleared_matches = sorted(cleared_matches, key=lambda cleared_match: self.__match_ids[cleared_match])
+        # Going in bracket order, each competitor is sent back to the
+        # first participant slot they hold among the cleared matches.
+        handles = self.__handles
+        number_of_competitors = self.__topology.number_of_competitors
+        for cleared_match in cleared_matches:
+            cleared_match_id = self.__match_ids[cleared_match]
+            for participant, slot in zip(cleared_match.get_participants(), self.__topology.sources[cleared_match_id]):
+                handle = handles[slot]
+                if handle is not None:
+                    self.__participant_by_handle[handle] = participant
+            cleared_match.get_winner_participant().set_competitor(None)
+            cleared_match.get_loser_participant().set_competitor(None)
+            winner_slot = number_of_competitors + 2 * cleared_match_id
+            handles[winner_slot] = None
+            handles[winner_slot + 1] = None
+            self.__results[cleared_match_id] = NOT_PLAYED
+            self.__emit(MATCH_CLEARED, cleared_match)
+        for affected_match in itertools.chain(cleared_matches, unplayed_matches):
+            was_ready = affected_match in self.__ready_matches
+            if affected_match.is_ready_to_start():
+                self.__ready_matches[affected_match] = None
+                if not was_ready:
+                    self.__emit(MATCH_READY, affected_match)
+            elif was_ready:
+                del self.__ready_matches[affected_match]
+                self.__emit(MATCH_NOT_READY, affected_match)
+        return cleared_matches
+
+    def __add_win(self, match, competitor):
+        # Checked while holding the match's locks, so only one result can be recorded for it.
+        if match not in self.__ready_matches:
+            raise Exception("Match is not ready to be played")
+        left_slot, right_slot = self.__topology.sources[self.__match_ids[match]]
+        winner_index = self.__get_winner_index(competitor, self.__handles[left_slot], self.__handles[right_slot])
+        self.__commit(self.__record_wins, [(match, winner_index)])
+
+    def __correct_win(self, match, winner_index):
+        cleared_matches = self.__revert_win(match)
+        self.__record_wins([(match, winner_index)])
+        return cleared_matches
+
+    def __record_wins(self, results, newly_ready_matches=None):
+        for match, winner_index in results:
+            self.__set_winner(match, winner_index, newly_ready_matches)
+            # Only the finals can leave the bracket reset to be decided automatically.
+            if match is self.__finals_match:
+                self.__resolve_bracket_reset()
+
+    def __apply_wins(self, results, by_side, errors=None):
+        newly_ready_matches = []
+        locks = self.__acquire_all()
+        try:
+            self.__commit(self.__record_wins, self.__check_wins(results, by_side, errors), newly_ready_matches)
+            # Leave out the matches that became ready and were then played in the same batch.
+            newly_ready_matches = [match for match in newly_ready_matches if match in self.__ready_matches]
+        finally:
+            self.__release(locks)
+        self.__deliver()
+        return newly_ready_matches
+
+    def __check_wins(self, results, by_side, errors=None):
+        # Check every result, in bracket order, against the state that the results before it
+        # in the batch will leave, without changing anything.
+        # Returns the (match, winner index) pairs to apply. If errors is a list, an invalid
+        # result's Exception is put in it at the result's position instead of being raised.
+        topology = self.__topology
+        number_of_competitors = topology.number_of_competitors
+        handles = self.__handles
+        # The handles and results that the batch changes, by slot and by match ID.
+        batch_handles = {}
+        batch_results = {}
+        checked_results = []
+        for position, (match, winner) in enumerate(results):
+            match_id = self.__match_ids[match]
+            left_slot, right_slot = topology.sources[match_id]
+            left_handle = batch_handles.get(left_slot, handles[left_slot])
+            right_handle = batch_handles.get(right_slot, handles[right_slot])
+            try:
+                if batch_results.get(match_id, self.__results[match_id]) != NOT_PLAYED:
+                    # A bracket reset that was decided automatically can be given too, as in a journal,
+                    # but only with the result it was decided with, the finals winner winning it.
+                    finals_index = topology.finals_index
+                    if (match_id == topology.bracket_reset_index
+                            and batch_results.get(finals_index, self.__results[finals_index]) == LEFT_WON):
+                        if by_side:
+                            is_decided_result = winner == 0
+                        else:
+                            is_decided_result = self.__handle_by_competitor.get(winner) == left_handle
+                        if is_decided_result:
+                            continue
+                    raise Exception("Match is not ready to be played")
+                if left_handle is None or right_handle is None:
+                    raise Exception("Match is not ready to be played")
+                winner_index = winner if by_side else self.__get_winner_index(winner, left_handle, right_handle)
+            except Exception as error:
+                if errors is None:
+                    raise
+                errors[position] = error
+                continue
+            winner_slot = number_of_competitors + 2 * match_id
+            batch_handles[winner_slot] = right_handle if winner_index else left_handle
+            batch_handles[winner_slot + 1] = left_handle if winner_index else right_handle
+            batch_results[match_id] = LEFT_WON if winner_index == 0 else RIGHT_WON
+            # If the incoming winner wins the finals, the bracket reset is decided with it.
+            if match_id == topology.finals_index and winner_index == 0 and self.__bracket_reset_finals:
+                batch_results[topology.bracket_reset_index] = LEFT_WON
+            checked_results.append((match, winner_index))
+        return checked_results
+
+    def __get_winner_index(self, competitor, left_handle, right_handle):
+        # Returns the position of the competitor in a match's participants, comparing handles.
+        handle = self.__handle_by_competitor.get(competitor)
+        if handle is not None:
+            if handle == left_handle:
+                return 0
+            if handle == right_handle:
+                return 1
+        raise Exception("Invalid competitor")
+
+    def __set_winner(self, match, winner_index, newly_ready_matches=None):
+        # Sets the winner and loser placeholders from the handles, the same as Match.set_winner.
+        # The matches that become ready are added to newly_ready_matches, if it is given.
+        match_id = self.__match_ids[match]
+        handles = self.__handles
+        sources = self.__topology.sources[match_id]
+        winner_handle = handles[sources[winner_index]]
+        loser_handle = handles[sources[1 - winner_index]]
+        winner_slot = self.__topology.number_of_competitors + 2 * match_id
+        handles[winner_slot] = winner_handle
+        handles[winner_slot + 1] = loser_handle
+        winner = match.get_winner_participant()
+        loser = match.get_loser_participant()
+        winner.set_competitor(self.__competitors[winner_handle])
+        loser.set_competitor(self.__competitors[loser_handle])
+        self.__participant_by_handle[winner_handle] = winner
+        self.__participant_by_handle[loser_handle] = loser
+        self.__results[match_id] = LEFT_WON if winner_index == 0 else RIGHT_WON
+        if self.__journal is not None:
+            self.__journal.append(match_id, winner_index)
+        self.__ready_matches.pop(match, None)
+        self.__emit(MATCH_COMPLETED, match)
+        # The bracket reset is never ready if the incoming winner won the finals,
+        # since it is decided automatically.
+        skipped_match = None
+        if self.__bracket_reset_finals and match is self.__finals_match and winner_index == 0:
+            skipped_match = self.__bracket_reset_finals_match
+        for participant in (winner, loser):
+            next_match = self.__next_match_by_participant.get(participant)
+            if next_match is None or next_match is skipped_match or next_match in self.__ready_matches:
+                continue
+            if next_match.is_ready_to_start():
+                self.__ready_matches[next_match] = None
+                if newly_ready_matches is not None:
+                    newly_ready_matches.append(next_match)
+                self.__emit(MATCH_READY, next_match)
+        if winner is self.__winner:
+            self.__emit(TOURNAMENT_WON, match)
+
+    def __commit(self, change, *args):
+        # Makes a change to the tournament's state, then publishes its events. They are only
+        # numbered and kept once the change is complete, so they never show a change half made.
+        with self.__commit_lock:
+            try:
+                return change(*args)
+            finally:
+                version = self.__first_version + len(self.__events)
+                self.__events.extend(
+                    (version + offset, kind, match) for offset, (kind, match) in enumerate(self.__pending_events, 1)
+                )
+                self.__pending_events = []
+
+    def __emit(self, kind, match):
+        self.__pending_events.append((kind, match))
+
+    def __deliver(self):
+        # Passes the published events to the subscribers, in order and one at a time.
+        # It is called by the public methods once their change is complete.
+        if self.__events_lock is not None:
+            with self.__events_lock:
+                self.__deliver_events()
+        else:
+            self.__deliver_events()
+
+    def __deliver_events(self):
+        events = self.__events
+        while self.__number_of_delivered_events < len(events):
+            event = events[self.__number_of_delivered_events]
+            self.__number_of_delivered_events += 1
+            for callback in list(self.__subscribers):
+                try:
+                    callback(event)
+                except Exception:
+                    # The change is already complete, so a failing subscriber only misses out.
+                    _logger.exception("Tournament event callback failed")
+
+    def __acquire(self, match):
+        # In thread safe mode, lock a match and the matches it feeds, in ID order so
+        # that threads never wait on each other in a cycle. Returns the locks to release.
+        if self.__locks is None:
+            return ()
+        match_id = self.__match_ids[match]
+        match_ids = {match_id}
+        for participant in (match.get_winner_participant(), match.get_loser_participant()):
+            next_match = self.__next_match_by_participant.get(participant)
+            if next_match is not None:
+                match_ids.add(self.__match_ids[next_match])
+        locks = [self.__locks[lock_id] for lock_id in sorted(match_ids)]
+        for lock in locks:
+            lock.acquire()
+        return locks
+
+    def __acquire_all(self):
+        if self.__locks is None:
+            return ()
+        for lock in self.__locks:
+            lock.acquire()
+        return self.__locks
+
+    def __release(self, locks):
+        for lock in reversed(locks):
+            lock.release()
+
+    def __resolve_bracket_reset(self):
         # If we show a match after the winner of the lower bracket beats the winner of the upper bracket
         if self.__bracket_reset_finals:
-            finals = self.__finals_match
             bracket_reset = self.__bracket_reset_finals_match
-            # If the finals match is played but the bracket reset match is not
-            if finals.get_winner_participant().get_competitor() is not None:
-                if bracket_reset.get_winner_participant().get_competitor() is None:
-                    # If the incoming winner of the finals match won the finals match, then don't play the reset
-                    if finals.get_winner_participant().get_competitor() is finals.get_participants()[0].get_competitor():
-                        self.add_win(bracket_reset, finals.get_winner_participant().get_competitor())
+            locks = self.__acquire(self.__finals_match)
+            try:
+                # If the finals match is played but the bracket reset match is not, and
+                # the incoming winner of the finals match won the finals match, then don't play the reset
+                results = self.__results
+                topology = self.__topology
+                if results[topology.finals_index] == LEFT_WON and results[topology.bracket_reset_index] == NOT_PLAYED:
+                    self.__set_winner(bracket_reset, 0)
+            finally:
+                self.__release(locks)
@@ -1,4 +1,7 @@
+import logging
+
 from double_elimination import Tournament as DoubleEliminationTournament
+from double_elimination.bracket import get_topology, BracketLayout
 
 def printMatches(matches):
     print("Active Matches:")
@@ -205,6 +208,244 @@ if __name__ == '__main__':
     if det.get_winners()[0] != 3:
         raise Exception("Invalid winner")
 
+    # Current and next match lookups
+    det = DoubleEliminationTournament(rangeBase1(4))
+    first_match = det.get_active_matches_for_competitor(1)[0]
+    if det.get_match_for_competitor(4) is not first_match:
+        raise Exception("Wrong current match")
+    winners_match, losers_match = det.get_next_matches(first_match)
+    det.add_win(first_match, 1)
+    if det.get_match_for_competitor(1) is not winners_match:
+        raise Exception("Wrong winner's next match")
+    if det.get_match_for_competitor(4) is not losers_match:
+        raise Exception("Wrong loser's next match")
+    if det.get_active_matches_for_competitor(4) != []:
+        raise Exception("Loser should be waiting for an opponent")
+
+    # Every way of asking for a topology shares one cached instance
+    if not (get_topology(8) is get_topology(8, True) is get_topology(8, bracket_reset_finals=True)):
+        raise Exception("Topology is cached more than once")
+
+    # Matches can be looked up from the layout alone, the same as in the built topology
+    for number_of_competitors in (2, 3, 7, 12, 100, 1025):
+        topology = get_topology(number_of_competitors)
+        layout = BracketLayout(number_of_competitors)
+        for match_index, sources in enumerate(topology.sources):
+            label = topology.get_match_label(match_index)
+            if layout.get_match_index(*label) != match_index or layout.get_sources(match_index) != sources:
+                raise Exception("Wrong layout of match {}".format(match_index))
+    layout = BracketLayout(2 ** 20)
+    if layout.get_match_index('losers', 3, 0) is None or layout.get_match_index('losers', 100, 0) is not None:
+        raise Exception("Wrong layout lookups")
+
+    # Match IDs
+    det = DoubleEliminationTournament(rangeBase1(4))
+    for match_id, match in enumerate(det.get_matches()):
+        if det.get_match(match_id) is not match or det.get_match_id(match) != match_id:
+            raise Exception("Wrong match ID")
+    if det.get_match_label(det.get_match(0)) != ('winners', 0, 0):
+        raise Exception("Wrong match label")
+    det.add_win_by_id(det.get_match_id(det.get_active_matches_for_competitor(1)[0]), 1)
+    checkActiveMatches(det, [[2, 3]])
+    for match_id in (-1, len(det.get_matches()), '0'):
+        try:
+            det.add_win_by_id(match_id, 2)
+            raise Exception('Expected error')
+        except Exception as error:
+            if str(error) != "Match does not exist":
+                raise
+    if det.get_results()[-1] != 0:
+        raise Exception("Match with a negative ID was played")
+
+    # Batch results, given out of order
+    det = DoubleEliminationTournament(rangeBase1(4))
+    first_round = det.get_active_matches()
+    newly_ready = det.add_wins([(first_round[1], 2), (first_round[0], 1)])
+    checkActiveMatches(det, [[1, 2], [3, 4]])
+    if len(newly_ready) != 2:
+        raise Exception("Wrong newly ready matches")
+    try:
+        det.add_wins([(det.get_match(5), 1)])
+        raise Exception('Expected error')
+    except Exception as error:
+        if str(error) != "Match is not ready to be played":
+            raise
+    # Batches are checked against the results before them, and nothing is applied if one is invalid
+    det = DoubleEliminationTournament(rangeBase1(4))
+    for bad_result, message in [((3, 1), "Invalid competitor"), ((4, 1), "Match is not ready to be played")]:
+        try:
+            det.add_wins([(det.get_match(0), 1), (det.get_match(1), 2), (det.get_match(bad_result[0]), bad_result[1])])
+            raise Exception('Expected error')
+        except Exception as error:
+            if str(error) != message:
+                raise
+        if det.get_results() != bytes(len(det.get_matches())) or det.get_version() != 0:
+            raise Exception("Invalid batch was partly applied")
+    det.add_wins([(det.get_match(0), 1), (det.get_match(1), 2), (det.get_match(2), 1), (det.get_match(3), 4)])
+    checkActiveMatches(det, [[2, 4]])
+    # try_add_wins applies the valid results and returns the errors of the others, in the order given
+    det = DoubleEliminationTournament(rangeBase1(4))
+    other_match = DoubleEliminationTournament(rangeBase1(4)).get_match(1)
+    errors = det.try_add_wins([(det.get_match(2), 1), (det.get_match(0), 5), (det.get_match(1), 2), (other_match, 2)])
+    if [None if error is None else str(error) for error in errors] != [
+        "Match is not ready to be played", "Invalid competitor", None, "Match is not in this tournament",
+    ]:
+        raise Exception("Wrong batch errors")
+    checkActiveMatches(det, [[1, 4]])
+    # A bracket reset that was decided automatically can only be given with the finals winner winning it
+    det = DoubleEliminationTournament(rangeBase1(2))
+    finals, bracket_reset = det.get_matches()[1:]
+    det.add_wins([(det.get_match(0), 1), (finals, 1), (bracket_reset, 1)])
+    if det.add_wins([(bracket_reset, 1)]) != [] or det.add_wins_by_side([(2, 0)]) != []:
+        raise Exception("Decided bracket reset was not accepted")
+    for bad_result in [(bracket_reset, 2), (bracket_reset, 'garbage')]:
+        try:
+            det.add_wins([bad_result])
+            raise Exception('Expected error')
+        except Exception as error:
+            if str(error) != "Match is not ready to be played":
+                raise
+    if str(det.try_add_wins([(bracket_reset, 2)])[0]) != "Match is not ready to be played":
+        raise Exception("Wrong bracket reset error")
+    if det.get_winners() != [1]:
+        raise Exception("Wrong winner after decided bracket reset")
+
+    # add_win on a match that isn't ready, or was already played, changes nothing
+    for thread_safe in (False, True):
+        det = DoubleEliminationTournament(rangeBase1(4), thread_safe=thread_safe)
+        det.add_win(det.get_match(0), 1)
+        results = det.get_results()
+        version = det.get_version()
+        for match_id, competitor in [(2, 1), (0, 4), (0, 1)]:
+            try:
+                det.add_win(det.get_match(match_id), competitor)
+                raise Exception('Expected error')
+            except Exception as error:
+                if str(error) != "Match is not ready to be played":
+                    raise
+            if det.get_results() != results or det.get_version() != version:
+                raise Exception("Match that wasn't ready was changed")
+        if det.get_match(0).get_winner_participant().get_competitor() != 1:
+            raise Exception("Played match was changed")
+        checkActiveMatches(det, [[2, 3]])
+
+    # Reverting and correcting results
+    det = DoubleEliminationTournament(rangeBase1(4))
+    add_win(det, 1)
+    add_win(det, 2)
+    add_win(det, 1)
+    add_win(det, 3)
+    checkActiveMatches(det, [[2, 3]])
+    first_match = det.get_match(0)
+    cleared = det.revert_win(first_match)
+    if cleared != [first_match, det.get_match(2), det.get_match(3)]:
+        raise Exception("Wrong cleared matches")
+    checkActiveMatches(det, [[1, 4]])
+    if det.get_match_for_competitor(3) is not det.get_match(3):
+        raise Exception("Wrong current match after revert")
+    results = det.get_results()
+    try:
+        det.correct_win(det.get_match(1), 99)
+        raise Exception('Expected error')
+    except Exception as error:
+        if str(error) != "Invalid competitor":
+            raise
+    if det.get_results() != results:
+        raise Exception("Invalid correction cleared results")
+    det.correct_win(det.get_match(1), 3)
+    checkActiveMatches(det, [[1, 4]])
+    add_win(det, 4)
+    checkActiveMatches(det, [[3, 4], [1, 2]])
+    try:
+        det.revert_win(det.get_match(4))
+        raise Exception('Expected error')
+    except Exception as error:
+        if str(error) != "Match has not been played":
+            raise
+    # A bracket reset decided by the finals can't be reverted or corrected on its own
+    det = DoubleEliminationTournament(['a', 'b'])
+    add_win(det, 'a')
+    add_win(det, 'a')
+    finals, bracket_reset = det.get_matches()[1:]
+    results = det.get_results()
+    version = det.get_version()
+    for change in (lambda: det.revert_win(bracket_reset), lambda: det.correct_win(bracket_reset, 'b')):
+        try:
+            change()
+            raise Exception('Expected error')
+        except Exception as error:
+            if str(error) != "Bracket reset was decided by the finals":
+                raise
+    if det.get_results() != results or det.get_version() != version or det.get_winners() != ['a']:
+        raise Exception("Decided bracket reset was changed")
+    if det.correct_win(finals, 'b') != [finals, bracket_reset]:
+        raise Exception("Wrong cleared matches")
+    checkActiveMatches(det, [['a', 'b']])
+    if det.get_active_matches() != [bracket_reset]:
+        raise Exception("Bracket reset should be ready after the finals were corrected")
+
+    # Events and changes since a version
+    det = DoubleEliminationTournament(rangeBase1(2))
+    events = []
+    det.subscribe(events.append)
+    add_win(det, 1)
+    add_win(det, 1)
+    kinds = [kind for __, kind, __ in events]
+    if kinds != ['match_completed', 'match_ready', 'match_completed', 'match_completed', 'tournament_won']:
+        raise Exception("Wrong events: {}".format(kinds))
+    if det.get_changes_since(3) != events[3:] or det.get_version() != 5:
+        raise Exception("Wrong changes")
+    det.revert_win(det.get_match(1))
+    kinds = [kind for __, kind, __ in det.get_changes_since(5)]
+    if kinds != ['match_cleared', 'match_cleared', 'match_ready']:
+        raise Exception("Wrong events: {}".format(kinds))
+
+    # Events are only passed on once the change is complete, and a failing subscriber doesn't stop it
+    det = DoubleEliminationTournament(rangeBase1(2))
+    seen_winners = []
+
+    def failing_subscriber(event):
+        seen_winners.append(det.get_winners())
+        raise Exception("Subscriber failed")
+    det.subscribe(failing_subscriber)
+    det.subscribe(events.append)
+    del events[:]
+    logging.disable(logging.CRITICAL)
+    add_win(det, 1)
+    add_win(det, 1)
+    logging.disable(logging.NOTSET)
+    if det.get_winners() != [1] or seen_winners[-3:] != [[1]] * 3 or len(events) != 5:
+        raise Exception("Events were passed on in the middle of a change")
+
+    # Competitors are compared by handle, so their __eq__ is never called
+    class Player:
+        comparisons = 0
+
+        def __init__(self, name):
+            self.name = name
+
+        def __eq__(self, other):
+            Player.comparisons += 1
+            return isinstance(other, Player) and self.name == other.name
+
+        def __hash__(self):
+            return hash(self.name)
+
+    players = [Player(name) for name in 'abcdefg']
+    det = DoubleEliminationTournament(players)
+    while det.get_winners() is None:
+        match = det.get_active_matches()[-1]
+        det.add_win(match, match.get_participants()[1].get_competitor())
+        det.get_active_matches_for_competitor(players[0])
+    if Player.comparisons != 0:
+        raise Exception("Competitors were compared {} times".format(Player.comparisons))
+    try:
+        DoubleEliminationTournament([Player('a'), Player('b'), Player('a')])
+        raise Exception('Expected error')
+    except Exception as error:
+        if str(error) != "Competitors must be unique":
+            raise
+
     print("Starting performance test")
 
     n = 20000
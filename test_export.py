@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+
+from double_elimination import Tournament
+from double_elimination.export import iter_json_lines, iter_match_records, write_csv, write_dot, write_json_lines
+
+tournament = Tournament(['a', 'b', 'c', 'd', 'e'])
+tournament.add_win(tournament.get_match(0), 'd')
+
+# Every match is exported in ID order, with its label and feed edges.
+records = list(iter_match_records(tournament))
+assert [record['id'] for record in records] == list(range(len(tournament.get_matches()))), 'bad match IDs'
+assert records[0]['winner'] == 'd' and records[0]['loser'] == 'e', 'bad result'
+assert records[1]['left_from'] == ('seed', 0) and records[1]['right_from'] == ('winner', 0), 'bad sources'
+assert records[0]['winner_to'] == 1 and records[0]['loser_to'] == 5, 'bad next matches'
+assert (records[4]['bracket'], records[4]['round'], records[4]['slot']) == ('losers', 0, 0), 'bad label'
+for record in records:
+    for kind, index in (record['left_from'], record['right_from']):
+        if kind != 'seed':
+            assert records[index][kind + '_to'] == record['id'], 'feed edges do not match'
+
+output = io.StringIO()
+write_json_lines(tournament, output)
+lines = [json.loads(line) for line in output.getvalue().splitlines()]
+assert lines[0] == {'version': tournament.get_version(), 'since_version': None}, 'bad JSON header'
+assert lines[1]['left_from'] == ['seed', 3], 'bad JSON record'
+assert len(lines) == len(records) + 1, 'bad number of JSON lines'
+
+output = io.StringIO(newline='')
+write_csv(tournament, output)
+rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+assert rows[1]['right_from'] == 'winner:0' and rows[1]['winner'] == '', 'bad CSV row'
+assert len(rows) == len(records), 'bad number of CSV rows'
+
+output = io.StringIO()
+write_dot(tournament, output)
+dot = output.getvalue()
+assert dot.startswith('digraph tournament {') and dot.endswith('}\n'), 'bad DOT graph'
+assert '  m0 -> m1 [style=solid];\n' in dot and '  m0 -> m5 [style=dashed];\n' in dot, 'bad DOT edges'
+
+# Only the matches changed since a version are exported.
+version = tournament.get_version()
+tournament.add_win(tournament.get_match(2), 'b')
+changed = [json.loads(line) for line in iter_json_lines(tournament, version)]
+assert changed[0] == {'version': tournament.get_version(), 'since_version': version}, 'bad delta header'
+assert [record['id'] for record in changed[1:]] == [2], 'bad delta matches'
+tournament.add_win(tournament.get_match(1), 'a')
+assert [record['id'] for record in iter_match_records(tournament, version)] == [1, 2, 3, 4], 'bad delta matches'
+assert list(iter_match_records(tournament, tournament.get_version())) == [], 'delta should be empty'
+
+print("Export tests passed")
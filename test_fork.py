@@ -0,0 +1,53 @@
+from double_elimination import Tournament
+
+tournament = Tournament(['a', 'b', 'c', 'd'])
+first_match = tournament.get_active_matches()[0]
+tournament.add_win(first_match, 'a')
+
+fork = tournament.fork()
+assert fork.get_results() == tournament.get_results(), 'bad fork results'
+assert fork.get_active_match_ids() == [tournament.get_match_id(m) for m in tournament.get_active_matches()]
+
+# Play the fork out, always picking the right participant, without changing the tournament.
+branch = None
+while fork.get_winners() is None:
+    match_id = fork.get_active_match_ids()[0]
+    fork.add_win_by_id(match_id, fork.get_participants(match_id)[1])
+    if branch is None:
+        branch = fork.fork()
+assert tournament.get_results()[1:] == bytes(len(tournament.get_matches()) - 1), 'fork changed tournament'
+assert branch.get_winners() is None, 'fork changed its branch'
+
+# The fork gives the same results as the tournament for the same wins.
+for match_id, result in enumerate(fork.get_results()):
+    if tournament.get_match(match_id).is_ready_to_start():
+        tournament.add_win_by_id(match_id, fork.get_participants(match_id)[result - 1])
+assert tournament.get_results() == fork.get_results(), 'bad fork results'
+assert tournament.get_winners() == fork.get_winners(), 'bad fork winner'
+
+# The bracket reset isn't played when the incoming winner wins the finals.
+fork = Tournament(['a', 'b']).fork()
+fork.add_win_by_id(0, 'a')
+fork.add_win_by_id(1, 'a')
+assert fork.get_winners() == ['a'], fork.get_winners()
+
+try:
+    fork.add_win_by_id(1, 'b')
+    assert False, 'allows playing a match twice'
+except Exception as error:
+    assert str(error) == 'Match is not ready to be played', error
+
+# Forks also take the tournament's Match objects.
+tournament = Tournament(['a', 'b', 'c', 'd'])
+fork = tournament.fork()
+first_match = tournament.get_active_matches()[0]
+fork.add_win(first_match, 'a')
+assert fork.get_result(tournament.get_match_id(first_match)) == 1, 'bad fork result'
+assert tournament.get_results() == bytes(len(tournament.get_matches())), 'fork changed tournament'
+try:
+    fork.add_win(Tournament(['a', 'b', 'c', 'd']).get_match(0), 'a')
+    assert False, 'allows a match from another tournament'
+except Exception as error:
+    assert str(error) == 'Match is not in this tournament', error
+
+print("Fork tests passed")
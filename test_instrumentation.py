@@ -0,0 +1,61 @@
+import gc
+import io
+import os
+import tempfile
+
+from double_elimination import Tournament
+from double_elimination import instrumentation
+from double_elimination.instrumentation import MemoryCollector, StatsdSink
+
+original_add_win = Tournament.add_win
+
+collector = MemoryCollector()
+instrumentation.enable(collector)
+assert instrumentation.is_enabled(), 'should be enabled'
+tournament = Tournament(['a', 'b', 'c', 'd'])
+while tournament.get_winners() is None:
+    match = tournament.get_active_matches()[0]
+    tournament.add_win(match, match.get_participants()[0].get_competitor())
+tournament.get_active_matches_for_competitor('a')
+
+assert collector.get_counter('tournament_init_calls') == 1, 'bad init count'
+assert collector.get_counter('tournament_add_win_calls') == 6, 'bad add_win count'
+assert collector.get_counter('tournament_get_winners_calls') == 7, 'bad get_winners count'
+assert collector.get_counter('tournament_resolve_bracket_reset_calls') == 1, 'bad bracket reset count'
+bounds, counts, total, count = collector.get_histogram('tournament_add_win_seconds')
+assert count == 6 and total > 0 and sum(counts) <= count, 'bad add_win timings'
+bounds, counts, total, count = collector.get_histogram('tournament_get_active_matches_matches')
+assert count == 6 and total == 8, 'bad number of matches returned'
+assert collector.get_histogram('tournament_get_active_matches_for_competitor_matches')[2] == 0, 'bad matches for a'
+assert collector.get_gauge('tournaments_alive') == 1, 'bad tournaments alive'
+del tournament, match
+gc.collect()
+assert collector.get_gauge('tournaments_alive') == 0, 'tournament should not be alive'
+
+text = collector.format_prometheus()
+assert '# TYPE double_elimination_tournament_add_win_calls_total counter\n' in text, 'bad counter'
+assert 'double_elimination_tournament_add_win_calls_total 6\n' in text, 'bad counter value'
+assert 'double_elimination_tournament_add_win_seconds_bucket{le="+Inf"} 6\n' in text, 'bad histogram'
+assert 'double_elimination_tournaments_alive 0\n' in text, 'bad gauge'
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, 'tournament.prom')
+    collector.write_prometheus(path)
+    with open(path) as file:
+        assert file.read() == text, 'bad Prometheus file'
+
+# A StatsD sink writes a line for every metric.
+output = io.StringIO()
+instrumentation.enable(StatsdSink(file=output))
+Tournament(['a', 'b']).get_active_matches()
+lines = output.getvalue().splitlines()
+assert 'double_elimination.tournament_init_calls:1|c' in lines, 'bad StatsD counter'
+assert 'double_elimination.tournament_get_active_matches_matches:1|h' in lines, 'bad StatsD histogram'
+assert any(line.startswith('double_elimination.tournament_init:') and line.endswith('|ms') for line in lines), \
+    'bad StatsD timing'
+
+# Disabling puts the original methods back.
+instrumentation.disable()
+assert not instrumentation.is_enabled(), 'should be disabled'
+assert Tournament.add_win is original_add_win, 'add_win was not restored'
+
+print("Instrumentation tests passed")
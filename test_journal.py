@@ -0,0 +1,64 @@
+import io
+
+from double_elimination import Tournament
+from double_elimination.journal import ResultJournal, read_journal
+
+file = io.BytesIO()
+tournament = Tournament(['a', 'b', 'c', 'd'])
+tournament.set_journal(ResultJournal(file))
+matches = tournament.get_active_matches()
+while len(matches) > 0:
+    match = matches[0]
+    tournament.add_win(match, match.get_participants()[0].get_competitor())
+    matches = tournament.get_active_matches()
+
+# The bracket reset finals match is decided automatically and is recorded too.
+file.seek(0)
+records = read_journal(file)
+assert len(records) == len(tournament.get_matches()), records
+
+# Cut the journal in the middle of the finals record, which is then ignored.
+replayed = Tournament(['a', 'b', 'c', 'd'])
+newly_ready = replayed.replay(read_journal(io.BytesIO(file.getvalue()[:-7])))
+assert replayed.get_winners() is None, 'bad winner'
+assert newly_ready == replayed.get_active_matches(), 'bad newly ready matches'
+assert replayed.get_active_matches() == [replayed.get_match(records[-2][0])], 'bad active matches'
+
+replayed = Tournament(['a', 'b', 'c', 'd'])
+replayed.replay(records)
+assert replayed.get_winners() == tournament.get_winners() == ['a'], 'bad winner'
+
+# Reverted results are recorded and replayed in order.
+file = io.BytesIO()
+tournament = Tournament(['a', 'b', 'c', 'd'])
+tournament.set_journal(ResultJournal(file))
+first_match = tournament.get_active_matches()[0]
+tournament.add_win(first_match, 'a')
+tournament.add_win(tournament.get_active_matches()[0], 'b')
+tournament.correct_win(first_match, 'd')
+file.seek(0)
+replayed = Tournament(['a', 'b', 'c', 'd'])
+replayed.replay(read_journal(file))
+assert [m.get_winner_participant().get_competitor() for m in replayed] == \
+    [m.get_winner_participant().get_competitor() for m in tournament], 'bad replay'
+
+# Correcting the finals after the bracket reset was decided by them keeps the journal in step.
+file = io.BytesIO()
+tournament = Tournament(['a', 'b'])
+tournament.set_journal(ResultJournal(file))
+tournament.add_win(tournament.get_match(0), 'a')
+tournament.add_win(tournament.get_match(1), 'a')
+try:
+    tournament.correct_win(tournament.get_match(2), 'b')
+    assert False, 'corrected a bracket reset decided by the finals'
+except Exception as error:
+    assert str(error) == 'Bracket reset was decided by the finals', error
+tournament.correct_win(tournament.get_match(1), 'b')
+tournament.add_win(tournament.get_match(2), 'b')
+file.seek(0)
+replayed = Tournament(['a', 'b'])
+replayed.replay(read_journal(file))
+assert replayed.get_results() == tournament.get_results(), 'bad replayed results'
+assert replayed.get_winners() == tournament.get_winners() == ['b'], 'bad replayed winner'
+
+print("Journal tests passed")
@@ -0,0 +1,71 @@
+from double_elimination import Tournament
+from double_elimination.odds import BracketOdds
+
+# The better seed always wins.
+always_better = [[1.0 if i < j else 0.0 for j in range(6)] for i in range(6)]
+tournament = Tournament(['a', 'b', 'c', 'd', 'e', 'f'])
+odds = BracketOdds(tournament, always_better)
+assert odds.get_win_probabilities() == {'a': 1.0}, odds.get_win_probabilities()
+
+# Two competitors, where 'a' beats 'b' with probability p:
+# 'a' wins the finals, or loses it and wins the bracket reset.
+p = 0.75
+tournament = Tournament(['a', 'b'])
+odds = BracketOdds(tournament, [[0.5, p], [1.0 - p, 0.5]])
+expected = p * p + p * (1.0 - p) * p + (1.0 - p) * p * p
+assert abs(odds.get_win_probabilities()['a'] - expected) < 1e-12, odds.get_win_probabilities()
+
+# Updating after each result gives the same odds as starting over.
+coin_flips = [[0.5] * 6 for __ in range(6)]
+tournament = Tournament(['a', 'b', 'c', 'd', 'e', 'f'])
+odds = BracketOdds(tournament, coin_flips)
+while tournament.get_winners() is None:
+    match = tournament.get_active_matches()[-1]
+    tournament.add_win(match, match.get_participants()[1].get_competitor())
+    odds.update(match)
+    fresh = BracketOdds(tournament, coin_flips)
+    for played in tournament:
+        assert odds.get_winner_distribution(played) == fresh.get_winner_distribution(played), 'bad update'
+assert odds.get_win_probabilities() == {tournament.get_winners()[0]: 1.0}, 'bad final odds'
+
+# The odds are exact: compare them with every possible playthrough of small brackets.
+def get_exact_win_probabilities(fork, win_probabilities, competitors):
+    # Play the first ready match both ways, weighting by the chance of each result.
+    match_ids = fork.get_active_match_ids()
+    if len(match_ids) == 0:
+        return {fork.get_winners()[0]: 1.0}
+    left, right = fork.get_participants(match_ids[0])
+    left_win_probability = win_probabilities[competitors.index(left)][competitors.index(right)]
+    probabilities = {}
+    for winner, probability in ((left, left_win_probability), (right, 1.0 - left_win_probability)):
+        branch = fork.fork()
+        branch.add_win_by_id(match_ids[0], winner)
+        branch_probabilities = get_exact_win_probabilities(branch, win_probabilities, competitors)
+        for competitor, branch_probability in branch_probabilities.items():
+            probabilities[competitor] = probabilities.get(competitor, 0.0) + probability * branch_probability
+    return probabilities
+
+for number_of_competitors in range(2, 7):
+    competitors = list('abcdefg'[:number_of_competitors])
+    skill = [1.0 + 0.7 * seed for seed in range(number_of_competitors)]
+    skewed = [[skill[j] / (skill[i] + skill[j]) for j in range(number_of_competitors)]
+              for i in range(number_of_competitors)]
+    for bracket_reset_finals in (True, False):
+        tournament = Tournament(competitors, bracket_reset_finals)
+        for played in range(2):
+            expected = get_exact_win_probabilities(tournament.fork(), skewed, competitors)
+            actual = BracketOdds(tournament, skewed).get_win_probabilities()
+            assert expected.keys() == actual.keys(), (expected, actual)
+            for competitor, probability in expected.items():
+                assert abs(actual[competitor] - probability) < 1e-12, (number_of_competitors, expected, actual)
+            match = tournament.get_active_matches()[0]
+            tournament.add_win(match, match.get_participants()[1].get_competitor())
+
+# Brackets too big to enumerate are refused rather than estimated.
+try:
+    BracketOdds(Tournament(list(range(64))), [[0.5] * 64 for __ in range(64)])
+    assert False, 'allows odds for a bracket too large to enumerate'
+except Exception as error:
+    assert str(error) == 'Bracket is too large for exact odds', error
+
+print("Odds tests passed")
@@ -0,0 +1,107 @@
+import os
+import tempfile
+
+from double_elimination import Tournament
+from double_elimination.registry import TournamentRegistry, ESTIMATED_BYTES_PER_MATCH
+
+
+def play(tournament, number_of_matches=None):
+    while tournament.get_winners() is None and number_of_matches != 0:
+        match = tournament.get_active_matches()[0]
+        tournament.add_win(match, match.get_participants()[0].get_competitor())
+        if number_of_matches is not None:
+            number_of_matches -= 1
+
+
+with tempfile.TemporaryDirectory() as directory:
+    # Room for two 8-competitor tournaments of 15 matches.
+    registry = TournamentRegistry(directory, memory_budget=2 * 15 * ESTIMATED_BYTES_PER_MATCH)
+    for tournament_id in ('a', 'b'):
+        registry.add(tournament_id, Tournament([f'{tournament_id}{seed}' for seed in range(8)]))
+    play(registry.get('a'), 3)
+    play(registry.get('b'))
+    assert registry.get_memory_used() == 2 * 15 * ESTIMATED_BYTES_PER_MATCH, 'bad memory used'
+    assert registry.get_hits() == 2 and registry.get_misses() == 0, 'bad counters'
+
+    # The finished tournament is evicted first, even though 'a' was used longer ago.
+    registry.add('c', Tournament([f'c{seed}' for seed in range(8)]))
+    assert registry.get_evictions() == 1, 'should have evicted one tournament'
+    assert len(os.listdir(directory)) == 1, 'should have written one snapshot'
+    assert len(registry) == 3 and 'b' in registry, 'evicted tournament should still be held'
+    a_results = registry.get('a').get_results()
+    assert registry.get_misses() == 0, 'a should not have been evicted'
+
+    # Loading 'b' evicts the least recently used tournament, which is now 'c'.
+    b = registry.get('b')
+    assert registry.get_misses() == 1 and registry.get_evictions() == 2, 'bad counters after loading'
+    assert b.get_winners() == ['b0'], 'bad restored winner'
+    c = registry.get('c')
+    assert registry.get_misses() == 2, 'c should have been evicted'
+    assert c.get_active_matches() == c.get_matches()[:4], 'bad restored tournament'
+    assert registry.get('a').get_results() == a_results, 'bad results for a'
+    assert registry.get_memory_used() <= 2 * 15 * ESTIMATED_BYTES_PER_MATCH, 'over budget'
+
+    # A tournament bigger than the budget stays in memory while it is the only one being used.
+    registry.add('big', Tournament(list(range(64))))
+    assert registry.get('big').get_matches()[0] is not None, 'bad big tournament'
+    assert len(registry) == 4, 'bad number of tournaments'
+
+    registry.remove('a')
+    registry.remove('big')
+    assert 'a' not in registry and len(registry) == 2, 'tournament was not removed'
+    assert len(os.listdir(directory)) == 2 - registry.get_memory_used() // (15 * ESTIMATED_BYTES_PER_MATCH), \
+        'snapshots should only exist for evicted tournaments'
+    try:
+        registry.get('a')
+        assert False, 'got a removed tournament'
+    except Exception as error:
+        assert str(error) == 'Tournament does not exist', 'bad missing tournament error'
+
+    # Tournaments that can't be written as snapshots are rejected up front.
+    try:
+        registry.add('objects', Tournament([object(), object()]))
+        assert False, 'added a tournament that cannot be evicted'
+    except Exception as error:
+        assert str(error) == "Competitors can't be stored in a snapshot", 'bad competitors error'
+    assert 'objects' not in registry, 'rejected tournament was added'
+
+    # If a snapshot can't be written, the tournament stays in memory and no file is left.
+    missing_directory = os.path.join(directory, 'missing')
+    registry = TournamentRegistry(missing_directory, memory_budget=15 * ESTIMATED_BYTES_PER_MATCH)
+    registry.add('a', Tournament([f'a{seed}' for seed in range(8)]))
+    try:
+        registry.add('b', Tournament([f'b{seed}' for seed in range(8)]))
+        assert False, 'wrote a snapshot to a missing directory'
+    except OSError:
+        pass
+    assert registry.get_evictions() == 0 and registry.get_misses() == 0, 'bad counters after failed eviction'
+    assert registry.get('a').get_active_matches() == registry.get('a').get_matches()[:4], 'a was lost'
+    assert not os.path.exists(missing_directory), 'partial snapshot was left'
+
+    # Registries sharing a directory don't overwrite each other's snapshots.
+    first = TournamentRegistry(directory, memory_budget=15 * ESTIMATED_BYTES_PER_MATCH)
+    second = TournamentRegistry(directory, memory_budget=15 * ESTIMATED_BYTES_PER_MATCH)
+    for registry, prefix in ((first, 'x'), (second, 'y')):
+        registry.add('a', Tournament([f'{prefix}{seed}' for seed in range(8)]))
+        play(registry.get('a'), 2)
+        registry.add('b', Tournament([f'{prefix}{seed}' for seed in range(8)]))
+    assert first.get('a').get_competitors()[0] == 'x0', 'snapshot was overwritten by another registry'
+    assert second.get('a').get_competitors()[0] == 'y0', 'snapshot was overwritten by another registry'
+
+    # A loaded tournament carries on from the version it was evicted at, and older versions raise.
+    tournament = first.get('a')
+    version = tournament.get_version()
+    assert version > 0, 'bad version'
+    first.get('b')
+    tournament = first.get('a')
+    assert tournament.get_version() == version, 'version was reset by loading'
+    play(tournament, 1)
+    assert [event[0] for event in tournament.get_changes_since(version)] == \
+        list(range(version + 1, tournament.get_version() + 1)), 'bad changes after loading'
+    try:
+        tournament.get_changes_since(version - 1)
+        assert False, 'returned changes from before the tournament was evicted'
+    except Exception as error:
+        assert str(error) == 'Changes before the loaded results are not kept', 'bad stale version error'
+
+print("Registry tests passed")
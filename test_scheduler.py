@@ -0,0 +1,40 @@
+from double_elimination import Tournament
+from double_elimination.bracket import get_topology
+from double_elimination.scheduler import StationScheduler, get_match_priorities, simulate_event_duration
+
+# In a 4 competitor bracket the winner's bracket final (2) feeds the loser's final and the finals.
+depths, critical_paths = get_match_priorities(get_topology(4))
+assert depths == [0, 0, 1, 1, 2, 3, 4], 'bad depths'
+assert critical_paths == [5, 5, 4, 4, 3, 2, 1], 'bad critical paths'
+
+now = 0.0
+tournament = Tournament(['a', 'b', 'c', 'd', 'e', 'f'])
+scheduler = StationScheduler(tournament, 2, rest_time=10.0, clock=lambda: now)
+assignments = scheduler.assign()
+assert [(station, tournament.get_match_id(match)) for station, match in assignments] == [(0, 0), (1, 1)], \
+    'bad first assignments'
+assert scheduler.assign() == [], 'no stations are free'
+
+# Recording a result frees its station, and the winner and loser have to rest before playing again.
+now = 5.0
+tournament.add_win(tournament.get_match(0), 'c')
+assert scheduler.get_assignments()[0] is None, 'station should be free'
+assert scheduler.get_station(tournament.get_match(1)) == 1, 'bad station'
+assert scheduler.assign() == [], 'c has to rest'
+assert scheduler.get_next_start_time() == 15.0, 'bad next start time'
+now = 15.0
+assert [tournament.get_match_id(match) for __, match in scheduler.assign()] == [3], 'c should be playing'
+
+# Reverting a result frees the stations of matches that are no longer ready.
+tournament.revert_win(tournament.get_match(0))
+assert scheduler.get_assignments()[0] is None, 'station should be freed by the revert'
+now = 16.0
+assert [tournament.get_match_id(match) for __, match in scheduler.assign()] == [0], 'match 0 should be played again'
+
+# More stations never make the event take longer, and with one station every match is played in turn.
+assert simulate_event_duration(8, 1, seed=3) in (14.0, 15.0), 'one station plays one match at a time'
+durations = [simulate_event_duration(64, stations, rest_time=0.5, seed=1) for stations in (1, 4, 16, 64)]
+assert durations == sorted(durations, reverse=True), 'bad durations: {}'.format(durations)
+assert simulate_event_duration(64, 8, seed=2) == simulate_event_duration(64, 8, seed=2), 'not reproducible'
+
+print("Scheduler tests passed")
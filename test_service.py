@@ -0,0 +1,94 @@
+import asyncio
+
+from double_elimination.service import TournamentService, LocalTransport
+
+
+async def main():
+    service = TournamentService()
+    tournament = await service.create('t1', ['a', 'b', 'c', 'd'])
+    await service.create('t2', ['w', 'x', 'y', 'z'], False)
+    assert len(service) == 2, 'bad number of tournaments'
+    try:
+        await service.create('t1', ['a', 'b'])
+        assert False, 'created a duplicate tournament'
+    except Exception as error:
+        assert str(error) == 'Tournament already exists', 'bad duplicate error'
+
+    assert await service.active_matches('t1') == [0, 1], 'bad active matches'
+    assert await service.wait_for_ready('t1', 'a') == 0, 'a should be ready'
+
+    # Both first round results are reported in the same burst, so they are applied in one batch.
+    await asyncio.gather(service.add_win('t1', 0, 'a'), service.add_win('t1', 1, 'b'))
+    assert await service.active_matches('t1') == [2, 3], 'bad active matches after the first round'
+    await service.add_win('t1', 2, 'a')
+    # a waits for the winner of the loser's bracket, and b for the winner of the first loser's match.
+    a_waiter = asyncio.ensure_future(service.wait_for_ready('t1', 'a'))
+    b_waiter = asyncio.ensure_future(service.wait_for_ready('t1', 'b'))
+    await asyncio.sleep(0)
+    assert not a_waiter.done() and not b_waiter.done(), 'woken before the next match was ready'
+    await service.add_win('t1', 3, 'd')
+    assert await b_waiter == 4, 'b should have been woken for their losers match'
+    assert not a_waiter.done(), 'a was woken before the finals were decided'
+    await service.add_win('t1', 4, 'd')
+    assert await a_waiter == 5, 'a should be woken for the finals'
+    assert await service.wait_for_ready('t1', 'c') is None, 'c is knocked out'
+
+    # Invalid results only fail their own request.
+    results = await asyncio.gather(
+        service.add_win('t1', 5, 'c'), service.add_win('t1', 0, 'a'), service.add_win('t1', 5, 'a'),
+        return_exceptions=True,
+    )
+    assert str(results[0]) == 'Invalid competitor', 'bad invalid competitor error'
+    assert str(results[1]) == 'Match is not ready to be played', 'bad not ready error'
+    assert results[2] is None, 'valid result failed'
+    assert tournament.get_winners() == ['a'], 'bad winner'
+    assert await service.active_matches('t2') == [0, 1], 'other tournament changed'
+
+    # The same operations through the in-process transport.
+    transport = LocalTransport(service)
+    assert await transport.request('active_matches', 't2') == [0, 1], 'bad transport result'
+    await transport.request('add_win', 't2', 0, 'w')
+    try:
+        await transport.request('add_win', 't3', 0, 'w')
+        assert False, 'used a missing tournament'
+    except Exception as error:
+        assert str(error) == 'Tournament does not exist', 'bad missing tournament error'
+    await transport.close()
+    await service.remove('t1')
+    assert len(service) == 1, 'tournament was not removed'
+
+    # Results with a match ID that isn't in the tournament fail on their own.
+    results = await asyncio.gather(
+        service.add_win('t2', 99, 'y'), service.add_win('t2', 'x', 'y'), return_exceptions=True,
+    )
+    assert str(results[0]) == 'Match does not exist', 'bad missing match error'
+    assert str(results[1]) == 'Match does not exist', 'bad invalid match ID error'
+
+    # A batch that fails as a whole fails every request in it.
+    class FailingJournal:
+        def append(self, match_id, winner_index):
+            raise Exception("Journal failed")
+
+    failing_tournament = await service.create('t4', ['a', 'b', 'c', 'd'])
+    failing_tournament.set_journal(FailingJournal())
+    results = await asyncio.gather(
+        service.add_win('t4', 0, 'a'), service.add_win('t4', 1, 'b'), return_exceptions=True,
+    )
+    assert [str(result) for result in results] == ['Journal failed'] * 2, 'failed batch was not reported'
+    await service.remove('t4')
+
+    # Removing a tournament fails its waiters and the results still queued for it.
+    waiter = asyncio.ensure_future(service.wait_for_ready('t2', 'w'))
+    await asyncio.sleep(0)
+    queued_result = asyncio.ensure_future(service.add_win('t2', 1, 'y'))
+    # The result is queued, but its batch hasn't been applied yet.
+    await asyncio.sleep(0)
+    await service.remove('t2')
+    results = await asyncio.gather(waiter, queued_result, return_exceptions=True)
+    assert str(results[0]) == 'Tournament was removed', 'waiter was not failed'
+    assert str(results[1]) == 'Tournament was removed', 'queued result was not failed'
+    assert len(service) == 0, 'tournament was not removed'
+
+
+asyncio.run(main())
+print("Service tests passed")
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import random
+import tempfile
+
+from double_elimination import Tournament
+from double_elimination.shared_store import SharedResultStore
+
+
+def play(path, tournament_id, seed):
+    # Each worker process opens the store itself and plays one tournament out.
+    store = SharedResultStore(path)
+    randomizer = random.Random(seed)
+    while store.get_winners(tournament_id) is None:
+        match_id = randomizer.choice(store.get_active_match_ids(tournament_id))
+        store.add_win(tournament_id, match_id, randomizer.choice(store.get_participants(tournament_id, match_id)))
+    winners = store.get_winners(tournament_id)
+    store.close()
+    return winners
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.store')
+        store = SharedResultStore(path, max_competitors=16, capacity=8)
+        first_id = store.create_tournament(5)
+        second_id = store.create_tournament(4, False)
+        assert (first_id, second_id) == (0, 1) and len(store) == 2, 'bad tournament IDs'
+
+        # The store gives the same results as a Tournament for the same wins.
+        competitors = ['a', 'b', 'c', 'd', 'e']
+        tournament = Tournament(competitors)
+        assert store.get_active_match_ids(first_id) == [0, 2], 'bad active matches'
+        while tournament.get_winners() is None:
+            match = tournament.get_active_matches()[-1]
+            match_id = tournament.get_match_id(match)
+            winner = match.get_participants()[1].get_competitor()
+            tournament.add_win(match, winner)
+            store.add_win(first_id, match_id, competitors.index(winner))
+            assert store.get_active_match_ids(first_id) == \
+                [tournament.get_match_id(active_match) for active_match in tournament.get_active_matches()], \
+                'active matches differ from the tournament'
+        results = store.get_results(first_id)
+        assert bytes(results) == tournament.get_results(), 'results differ from the tournament'
+        assert store.get_winners(first_id) == [competitors.index(tournament.get_winners()[0])], 'bad winner'
+        loaded = store.load_tournament(first_id, competitors)
+        assert loaded.get_results() == tournament.get_results(), 'bad loaded tournament'
+        assert loaded.get_winners() == tournament.get_winners() and loaded.get_version() == 0, 'bad loaded tournament'
+        assert store.get_version(first_id) > 0 and store.get_version(second_id) == 0, 'bad versions'
+
+        for match_id, seed, message in (
+            (2, 0, 'Match is not ready to be played'), (0, 1, 'Invalid competitor'),
+            (-1, 0, 'Match does not exist'), (99, 0, 'Match does not exist'),
+        ):
+            try:
+                store.add_win(second_id, match_id, seed)
+                assert False, 'added an invalid result'
+            except Exception as error:
+                assert str(error) == message, 'bad invalid result error'
+
+        # Another process sees results written here, and its results without copying anything.
+        store.add_win(second_id, 0, 0)
+        try:
+            store.add_win(second_id, 0, 0)
+            assert False, 'played a match twice'
+        except Exception as error:
+            assert str(error) == 'Match is not ready to be played', 'bad played match error'
+        with multiprocessing.Pool(2) as pool:
+            winners = pool.starmap(play, [(path, second_id, 1)] + [(path, store.create_tournament(16), 2)])
+        assert store.get_winners(second_id) == winners[0], 'result written by another process not seen'
+        assert store.get_winners(2) == winners[1], 'result written by another process not seen'
+        assert results[0] != 0, 'views should follow the file'
+        results.release()
+        store.close()
+
+        # Reopening the file keeps its sizes and results.
+        store = SharedResultStore(path, max_competitors=4, capacity=1)
+        assert len(store) == 3 and store.get_number_of_competitors(2) == 16, 'bad reopened store'
+        store.close()
+
+    print("Shared store tests passed")
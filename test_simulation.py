@@ -0,0 +1,52 @@
+from double_elimination import Tournament
+from double_elimination.simulation import (
+    simulate, simulate_many, simulate_what_if, DEFAULT_CHUNK_SIZE, STREAM_SIZE,
+)
+
+competitors = ['a', 'b', 'c', 'd', 'e']
+# The better seed always wins.
+always_better = [[1.0 if i < j else 0.0 for j in range(5)] for i in range(5)]
+results = simulate(Tournament(competitors), always_better, 1000, seed=1)
+assert results.get_win_probabilities()['a'] == 1.0, results.get_win_probabilities()
+assert results.get_top_three_probabilities() == {'a': 1.0, 'b': 1.0, 'c': 1.0, 'd': 0.0, 'e': 0.0}
+assert results.get_round_probabilities()[('finals', 1)]['a'] == 0.0, 'bracket reset was played'
+
+# Recorded results are kept, so 'e' can still win after upsetting everyone.
+tournament = Tournament(competitors)
+while tournament.get_winners() is None:
+    match = tournament.get_active_matches()[0]
+    if 'e' in [participant.get_competitor() for participant in match.get_participants()]:
+        tournament.add_win(match, 'e')
+    else:
+        break
+results = simulate(tournament, always_better, 1000, seed=1)
+assert sum(results.get_win_probabilities().values()) == 1.0, 'bad probabilities'
+
+# Coin flips give the same results for the same seed, however the simulations are split up.
+coin_flips = [[0.5] * 5 for __ in range(5)]
+first = simulate(Tournament(competitors), coin_flips, 10000, seed=7, chunk_size=1000)
+for chunk_size in (STREAM_SIZE, 3 * STREAM_SIZE, DEFAULT_CHUNK_SIZE):
+    second = simulate(Tournament(competitors), coin_flips, 10000, seed=7, chunk_size=chunk_size)
+    assert first.get_win_probabilities() == second.get_win_probabilities(), 'depends on the chunk size'
+    assert first.get_round_probabilities() == second.get_round_probabilities(), 'depends on the chunk size'
+assert simulate(Tournament(competitors), coin_flips, 10000, seed=8).get_win_probabilities() != \
+    first.get_win_probabilities(), 'seed is ignored'
+assert abs(sum(first.get_top_three_probabilities().values()) - 3.0) < 1e-9, 'bad top three'
+
+if __name__ == '__main__':
+    # Splitting simulations across processes gives the same results as running them in one.
+    tournaments = [Tournament(competitors), Tournament(competitors[:3], False)]
+    jobs = [(tournaments[0], coin_flips), (tournaments[1], [row[:3] for row in coin_flips[:3]])]
+    many = simulate_many(jobs, 10000, seed=7, processes=2, chunk_size=STREAM_SIZE)
+    assert many[0].get_win_probabilities() == first.get_win_probabilities(), 'bad parallel results'
+    single = simulate(tournaments[1], jobs[1][1], 10000, seed=7)
+    assert many[1].get_round_probabilities() == single.get_round_probabilities(), 'bad parallel results'
+
+    tournament = Tournament(competitors)
+    what_if = simulate_what_if(tournament, always_better, 100, processes=2)
+    assert len(what_if) == 4, what_if
+    for (match, competitor), scenario in what_if.items():
+        __, round_number, __ = tournament.get_match_label(match)
+        assert scenario.get_round_probabilities()[('winners', round_number + 1)][competitor] == 1.0, 'bad what if'
+
+print("Simulation tests passed")
@@ -0,0 +1,78 @@
+from double_elimination import Tournament
+from double_elimination.snapshot import (
+    dump_snapshot, load_snapshot, dump_json_snapshot, load_json_snapshot, get_results,
+)
+
+for bracket_reset_finals in (True, False):
+    tournament = Tournament(['a', 'b', 'c', 'd', 'e'], bracket_reset_finals)
+    snapshots = []
+    matches = tournament.get_active_matches()
+    while len(matches) > 0:
+        match = matches[-1]
+        tournament.add_win(match, match.get_participants()[1].get_competitor())
+        snapshots.append((dump_snapshot(tournament), dump_json_snapshot(tournament), get_results(tournament)))
+        matches = tournament.get_active_matches()
+
+    for snapshot, json_snapshot, results in snapshots:
+        for restored in (load_snapshot(snapshot), load_json_snapshot(json_snapshot)):
+            assert get_results(restored) == results, 'bad results'
+            assert restored.has_bracket_reset_finals() == bracket_reset_finals, 'bad bracket reset'
+    assert load_snapshot(snapshots[-1][0]).get_winners() == tournament.get_winners(), 'bad winner'
+
+restored = load_snapshot(dump_snapshot(Tournament(['a', 'b', 'c'])))
+assert [len(restored.get_active_matches_for_competitor(c)) for c in 'abc'] == [0, 1, 1], 'bad active matches'
+
+for competitors in ([('a', 1), ('b', 2), ('c', 3)], [object(), object()]):
+    for dump in (dump_snapshot, dump_json_snapshot):
+        try:
+            dump(Tournament(competitors))
+            assert False, 'allows competitors that are not restored as they are'
+        except Exception as error:
+            assert str(error) == "Competitors can't be stored in a snapshot", error
+
+# Restoring sets the results directly, without events
+tournament = Tournament(list(range(6)))
+tournament.add_wins_by_side([(match_id, match_id % 2) for match_id in range(5)])
+restored = load_snapshot(dump_snapshot(tournament))
+assert restored.get_version() == 0, 'restoring recorded events'
+assert sorted(map(restored.get_match_id, restored.get_active_matches())) == \
+    sorted(map(tournament.get_match_id, tournament.get_active_matches())), 'bad restored active matches'
+for competitor in range(6):
+    match = tournament.get_match_for_competitor(competitor)
+    restored_match = restored.get_match_for_competitor(competitor)
+    assert (match is None and restored_match is None) or \
+        tournament.get_match_id(match) == restored.get_match_id(restored_match), 'bad restored current match'
+bad_results = bytearray(dump_snapshot(Tournament(list(range(6)))))
+bad_results[-1] = 1
+try:
+    load_snapshot(bytes(bad_results))
+    assert False, 'allows a result for a match whose participants are not decided'
+except Exception as error:
+    assert str(error) == 'Invalid snapshot', error
+
+# Corrupt headers and payloads fail the same way
+valid = dump_snapshot(Tournament(['a', 'b', 'c']))
+valid_json = dump_json_snapshot(Tournament(['a', 'b', 'c']))
+for load, snapshot in [
+    (load_snapshot, valid[:9] + b'\xff' + valid[10:]),
+    (load_snapshot, valid[:9] + b'{' + valid[10:]),
+    (load_snapshot, valid[:9] + b'["a","a","c"]' + valid[22:]),
+    (load_snapshot, valid[:9] + b'[["a"],"b",1]' + valid[22:]),
+    (load_json_snapshot, valid_json[:-5]),
+    (load_json_snapshot, '[1]'),
+    (load_json_snapshot, '{"version": 1}'),
+    (load_json_snapshot, valid_json.replace('"results":[', '"results":[7,')),
+]:
+    try:
+        load(snapshot)
+        assert False, 'allows loading a corrupt snapshot'
+    except Exception as error:
+        assert str(error) == 'Invalid snapshot', error
+
+try:
+    load_snapshot(b'not a snapshot')
+    assert False, 'allows loading bad snapshot'
+except Exception as error:
+    assert str(error) == 'Invalid snapshot', error
+
+print("Snapshot tests passed")
@@ -0,0 +1,168 @@
+import random
+import sys
+import threading
+
+from double_elimination import Tournament
+
+# Switch threads often so that results really are recorded at the same time.
+sys.setswitchinterval(1e-6)
+
+number_of_competitors = 300
+number_of_threads = 16
+randomizer = random.Random(7)
+
+# Decide the winning side of every match up front, then play the bracket out serially.
+sides = [randomizer.randrange(2) for __ in range(2 * number_of_competitors)]
+serial = Tournament(list(range(number_of_competitors)))
+while serial.get_winners() is None:
+    for match in serial.get_active_matches():
+        serial.add_win(match, match.get_participants()[sides[serial.get_match_id(match)]].get_competitor())
+
+for attempt in range(3):
+    tournament = Tournament(list(range(number_of_competitors)), thread_safe=True)
+    versions = []
+    tournament.subscribe(lambda event: versions.append(event[0]))
+    claimed_match_ids = set()
+    claim_lock = threading.Lock()
+    errors = []
+
+    def report():
+        try:
+            while tournament.get_winners() is None:
+                for match in tournament.get_active_matches():
+                    match_id = tournament.get_match_id(match)
+                    with claim_lock:
+                        if match_id in claimed_match_ids:
+                            continue
+                        claimed_match_ids.add(match_id)
+                    winner = match.get_participants()[sides[match_id]].get_competitor()
+                    tournament.add_win(match, winner)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=report) for __ in range(number_of_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == [], f'errors while reporting: {errors}'
+    assert tournament.get_results() == serial.get_results(), 'results differ from the serial replay'
+    assert tournament.get_winners() == serial.get_winners(), 'winner differs from the serial replay'
+    assert tournament.get_active_matches() == [], 'matches left ready'
+    assert versions == list(range(1, tournament.get_version() + 1)), 'events out of order'
+    for competitor in range(number_of_competitors):
+        assert tournament.get_match_for_competitor(competitor) == serial.get_match_for_competitor(competitor) is None, \
+            'competitor still has a match'
+    for match, serial_match in zip(tournament, serial):
+        assert match.get_winner_participant().get_competitor() == serial_match.get_winner_participant().get_competitor()
+        assert match.get_loser_participant().get_competitor() == serial_match.get_loser_participant().get_competitor()
+
+# Correcting results while other threads keep reporting leaves a consistent bracket.
+tournament = Tournament(list(range(64)), thread_safe=True)
+first_round = tournament.get_active_matches()
+for match in first_round:
+    tournament.add_win(match, match.get_participants()[0].get_competitor())
+
+
+def correct(matches):
+    for match in matches:
+        tournament.correct_win(match, match.get_participants()[1].get_competitor())
+
+
+threads = [threading.Thread(target=correct, args=(first_round[index::4],)) for index in range(4)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert all(match.get_winner_participant().get_competitor() == match.get_participants()[1].get_competitor()
+           for match in first_round), 'bad corrections'
+assert len(tournament.get_active_matches()) == 32, 'bad active matches after corrections'
+
+# Batches and single results reported at the same time, while other threads fork and read the tournament.
+for attempt in range(3):
+    tournament = Tournament(list(range(number_of_competitors)), thread_safe=True)
+    claimed_match_ids = set()
+    claim_lock = threading.Lock()
+    newly_ready_match_ids = []
+    errors = []
+
+    def claim_active_matches():
+        claimed_matches = []
+        for match in tournament.get_active_matches():
+            match_id = tournament.get_match_id(match)
+            with claim_lock:
+                if match_id in claimed_match_ids:
+                    continue
+                claimed_match_ids.add(match_id)
+            claimed_matches.append((match, match.get_participants()[sides[match_id]].get_competitor()))
+        return claimed_matches
+
+    def report_batches():
+        try:
+            while tournament.get_winners() is None:
+                newly_ready = tournament.add_wins(claim_active_matches())
+                newly_ready_match_ids.extend(tournament.get_match_id(match) for match in newly_ready)
+        except Exception as error:
+            errors.append(error)
+
+    def report_singly():
+        try:
+            while tournament.get_winners() is None:
+                for match, winner in claim_active_matches():
+                    tournament.add_win(match, winner)
+        except Exception as error:
+            errors.append(error)
+
+    def fork():
+        try:
+            while tournament.get_winners() is None:
+                tournament_fork = tournament.fork()
+                for match_id in tournament_fork.get_active_match_ids():
+                    assert tournament_fork.get_result(match_id) == 0, 'fork has a played match ready'
+                    assert None not in tournament_fork.get_participants(match_id), 'fork has an undecided match ready'
+        except Exception as error:
+            errors.append(error)
+
+    def read():
+        try:
+            while tournament.get_winners() is None:
+                # A played match is never ready again, so a match played before the ready matches are
+                # read must not be among them, unless the reader saw a result half recorded.
+                results = tournament.get_results()
+                for match in tournament.get_active_matches():
+                    assert results[tournament.get_match_id(match)] == 0, 'a reader saw a played match ready'
+        except Exception as error:
+            errors.append(error)
+
+    targets = [report_batches, report_singly] * (number_of_threads // 2) + [fork, read] * 2
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == [], f'errors while reporting: {errors}'
+    assert tournament.get_results() == serial.get_results(), 'results differ from the serial replay'
+    assert tournament.get_active_matches() == [], 'matches left ready'
+    assert len(newly_ready_match_ids) == len(set(newly_ready_match_ids)), 'a match was returned as newly ready twice'
+
+# Readers in other threads never see a result half recorded, such as the finals played but
+# the bracket reset not yet decided, even while the events of the result are being passed on.
+tournament = Tournament(['a', 'b'], thread_safe=True)
+seen_winners = []
+
+
+def read_during_event(event):
+    reader = threading.Thread(target=lambda: seen_winners.append(tournament.get_winners()))
+    reader.start()
+    reader.join(timeout=5)
+    assert not reader.is_alive(), 'a reader was blocked while events were passed on'
+
+
+tournament.add_win(tournament.get_match(0), 'a')
+tournament.subscribe(read_during_event)
+tournament.add_win(tournament.get_match(1), 'a')
+assert seen_winners == [['a']] * 3, f'readers saw {seen_winners}'
+
+print("Thread safety tests passed")